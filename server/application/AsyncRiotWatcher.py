@@ -0,0 +1,149 @@
+"""
+Asyncio version of the RiotWatcher module API, on top of aiohttp.
+
+Requests share one aiohttp session (keep-alive connection pool) and at most `concurrency` of them
+are in flight at the same time. Matchlists and match details are fetched with asyncio.gather, so a
+single process can sync hundreds of players without a blocking thread per call.
+Retryable errors (timeouts, 429, 5xx) are retried with exponential backoff and jitter, honouring
+Retry-After up to max_delay, behind the same per-host circuit breakers as RiotWatcher (RiotWatcher.breakers),
+so a host found down by either client is skipped by both.
+
+AsyncRiotWatcher(api_key: str, concurrency: int)
+    async get_puuid(user: str, region: str)                                  -- returns string
+    async get_matchlist(puuid: str, region: str, num_matches: int)           -- returns list
+    async get_player_match_stats(puuid: str, region: str, matches: list, [stats]: list)
+                                                                             -- returns dictionary
+    async get_players_match_stats(players: list, num_matches: int, [stats]: list)
+        Full pipeline for many players: puuid, matchlist and match details for every
+        (summoner name, region) pair, all gathered concurrently.
+        returns dictionary -- {summoner name: {match ID: {stat: value}}}, or {summoner name: exception}
+                              for a player whose lookup failed, so one bad player does not fail the batch
+
+platform_to_regional(region: str)
+    Same as RiotWatcher.platform_to_regional
+
+Example usage:
+
+    async def sync_players():
+        async with AsyncRiotWatcher(YOUR_RIOT_API_KEY, concurrency=20) as watcher:
+            return await watcher.get_players_match_stats([("Topo", "North America"), ("Bob", "Korea")], 5,
+                                                         "kills", "deaths", "assists", "win")
+
+    stats = asyncio.run(sync_players())
+"""
+
+from .RiotWatcher import regions, platform_to_regional, get_breaker
+from .CircuitBreaker import UpstreamUnavailableError, RETRYABLE_STATUSES
+from urllib.parse import quote
+import asyncio
+import aiohttp
+import random
+
+API_URL = "https://{routing}.api.riotgames.com"
+
+
+class AsyncRiotWatcher:
+    """
+    Asyncio client for the Riot endpoints used by CharitableGaming.
+    """
+
+    def __init__(self, api_key, concurrency=20, connect_timeout=3.05, read_timeout=10.0, retries=2, max_delay=2.0):
+        self._api_key = api_key
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self._concurrency = concurrency
+        self._retries = retries
+        self._max_delay = max_delay
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_puuid(self, user, region):
+        platform = regions[region]
+        player = await self._get(platform, f"/lol/summoner/v4/summoners/by-name/{quote(user)}")
+        return player['puuid']
+
+    async def get_matchlist(self, puuid, region, num_matches=1):
+        region = platform_to_regional(region)
+        return await self._get(region, f"/lol/match/v5/matches/by-puuid/{puuid}/ids", count=num_matches)
+
+    async def get_player_match_stats(self, puuid, region, matches, *args):
+        region = platform_to_regional(region)
+        match_dtos = await asyncio.gather(*(self._get(region, f"/lol/match/v5/matches/{match}") for match in matches))
+
+        all_player_match_stats = {}
+        for match, match_dto in zip(matches, match_dtos):
+            participants = match_dto['info']['participants']
+            player = next(item for item in participants if item['puuid'] == puuid)
+            all_player_match_stats[match] = {arg: player[arg] for arg in args}
+
+        return all_player_match_stats
+
+    async def get_players_match_stats(self, players, num_matches=1, *args):
+        async def player_pipeline(user, region):
+            puuid = await self.get_puuid(user, region)
+            matches = await self.get_matchlist(puuid, region, num_matches)
+            return await self.get_player_match_stats(puuid, region, matches, *args)
+
+        results = await asyncio.gather(*(player_pipeline(user, region) for user, region in players), return_exceptions=True)
+        return {user: result for (user, _region), result in zip(players, results)}
+
+    async def _get(self, routing, path, **params):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._concurrency, limit_per_host=self._concurrency)
+            self._session = aiohttp.ClientSession(headers={"X-Riot-Token": self._api_key},
+                                                  timeout=self._timeout, connector=connector)
+
+        breaker = get_breaker(routing)
+
+        url = API_URL.format(routing=routing.lower()) + path
+        for attempt in range(self._retries + 1):
+            breaker.before_call()
+            retry_after = None
+
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url, params=params) as response:
+                        if response.status not in RETRYABLE_STATUSES:
+                            # The host answered, even a 404 means it is up
+                            breaker.record_success()
+                            response.raise_for_status()
+                            return await response.json()
+
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as err:
+                breaker.record_failure()
+                error = err
+
+            except BaseException:
+                # Cancelled, or failed for a reason that says nothing about the host's health:
+                # release the half-open trial this call may hold, or the circuit would stay open
+                breaker.record_ignored()
+                raise
+
+            else:
+                if status == 429:
+                    breaker.record_ignored()
+                else:
+                    breaker.record_failure()
+                error = f'HTTP {status}'
+
+            if attempt == self._retries:
+                raise UpstreamUnavailableError(f'{routing} unavailable: {error}')
+
+            if retry_after and retry_after.isdigit():
+                delay = min(float(retry_after), self._max_delay)
+            else:
+                delay = random.uniform(0, min(self._max_delay, 0.25 * 2 ** attempt))
+            await asyncio.sleep(delay)
@@ -0,0 +1,88 @@
+"""
+backfill_player(fbase, player_id: str, region: str, max_matches: int, since: datetime)
+    Ingests a player's match history, beyond the few most recent games fetched by /api/get_user_league_games
+
+    Pages through matchlist_by_puuid with start/count, most recent matches first, until max_matches
+    match IDs have been read, the history ends, or the matches are older than since.
+    Match details are fetched concurrently, a chunk at a time, and each chunk is written to leaguestats
+    before the next one is fetched, so only one page of IDs and one chunk of stats are held in memory.
+
+    Progress is saved in the 'backfills' collection after every chunk. Calling backfill_player again
+    for the same player continues where the last run stopped. The matchlist is read up to the time the
+    backfill first started, so games played in between do not shift the saved position in the list. Chunks are written idempotently
+    (see FirebaseFuncs.ingest_league_matches), so a chunk interrupted half-way is safely written again.
+
+    parameters: fbase (FirebaseFuncs) -- The FirebaseFuncs connection
+                player_id (string) -- The summoner name of the player
+                region (string) -- The full name of the region (e.g., "North America")
+
+    parameters (optional): max_matches -- how deep into the history to go (default is 1000)
+                           since -- only matches played after this datetime (default is no limit)
+                           workers -- number of match details fetched at the same time (default is 4)
+                           chunk_size -- number of matches written at a time (default is 20)
+                           restart -- ignore saved progress and start from the most recent match
+
+    returns:    int -- number of new matches added
+
+Riot rate limits are respected by riotwatcher, which waits when a limit is close, so workers only
+bounds how many requests are waiting or in flight at the same time.
+
+Example usage:
+
+    backfill_player(fbase, "Topo", "North America", max_matches=500)
+
+Or from the server directory:
+
+    python backfill.py Topo "North America" --depth 500 --since 2022-01-01
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from . import RiotWatcher
+import time
+
+# matchlist_by_puuid returns at most 100 match IDs per page
+PAGE_SIZE = 100
+
+STATS = ("kills", "deaths", "assists", "win")
+
+
+def backfill_player(fbase, player_id, region, max_matches=1000, since=None, workers=4, chunk_size=20, restart=False):
+    start_time = int(since.timestamp()) if since is not None else None
+    state = None if restart else fbase.get_backfill_state(player_id)
+
+    if state is None or state['max_matches'] != max_matches or state['since'] != start_time:
+        state = {'next_start': 0, 'done': False, 'max_matches': max_matches, 'since': start_time, 'end_time': int(time.time())}
+
+    elif 'end_time' not in state and not state['done']:
+        # Saved without an end time, so its position may have shifted: start over, writes are idempotent
+        state = dict(state, next_start=0, end_time=int(time.time()))
+
+    if state['done']:
+        return 0
+
+    puuid = RiotWatcher.get_puuid(player_id, region)
+    added = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while state['next_start'] < max_matches:
+            count = min(PAGE_SIZE, max_matches - state['next_start'])
+            page = RiotWatcher.get_matchlist_page(puuid, region, state['next_start'], count, start_time, state['end_time'])
+
+            for chunk_start in range(0, len(page), chunk_size):
+                chunk = page[chunk_start:chunk_start + chunk_size]
+                stats = {}
+                for match_stats in executor.map(lambda match: RiotWatcher.get_player_match_stats(puuid, region, [match], *STATS), chunk):
+                    stats.update(match_stats)
+
+                added += fbase.ingest_league_matches(player_id, stats)
+                state['next_start'] += len(chunk)
+                fbase.set_backfill_state(player_id, state)
+
+            if len(page) < count:
+                # Reached the start of the player's history
+                break
+
+    state['done'] = True
+    fbase.set_backfill_state(player_id, state)
+
+    return added
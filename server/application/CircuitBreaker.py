@@ -0,0 +1,173 @@
+"""
+Circuit breakers and retries with exponential backoff for calls to an upstream API.
+
+A CircuitBreaker counts consecutive failures of an upstream host. After failure_threshold failures
+the circuit opens and calls fail right away with CircuitOpenError, instead of waiting on a host that
+is down. After reset_timeout seconds a single trial call is let through (half-open): it closes the
+circuit if it succeeds and opens it again if it fails.
+
+call_with_retries retries retryable errors with exponential backoff and full jitter, honouring
+Retry-After on 429 responses. When the retries are exhausted it raises UpstreamUnavailableError.
+
+Example usage:
+
+    breaker = CircuitBreaker('AMERICAS')
+    match_dto = call_with_retries(breaker, lol_watcher.match.by_id, 'AMERICAS', 'NA1_4255177813')
+"""
+
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+import random
+import threading
+import time
+
+# Statuses worth retrying. 429 is retried but does not count against the host's circuit.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised when an upstream call failed with a retryable error and all retries were used.
+    """
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """
+    Raised without calling the upstream host because its circuit is open.
+    """
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class CircuitBreaker:
+    """
+    Tracks the failures of one upstream host. Thread-safe.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """
+        Raises CircuitOpenError if the call must not go through.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+            raise CircuitOpenError(f'Circuit for {self.name} is open.')
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_ignored(self):
+        """The call failed for a reason that says nothing about the host's health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def _status_code(err):
+    response = getattr(err, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def is_retryable(err):
+    """True for timeouts, connection errors and HTTP errors with a retryable status."""
+    if isinstance(err, (Timeout, ConnectionError)):
+        return True
+    return isinstance(err, HTTPError) and _status_code(err) in RETRYABLE_STATUSES
+
+
+def _backoff_delay(err, attempt, base_delay, max_delay):
+    if _status_code(err) == 429:
+        retry_after = err.response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), max_delay)
+
+    # Full jitter: anywhere between 0 and the exponential delay
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retries(breaker, func, *args, retries=2, base_delay=0.25, max_delay=2.0, **kwargs):
+    """
+    Calls func(*args, **kwargs) through the circuit breaker, retrying retryable errors.
+
+    Args:
+        breaker (CircuitBreaker): The breaker of the host that is called
+        func (callable): Performs the call
+        retries (int): Number of retries after the first attempt
+        base_delay (float): Delay before the first retry, doubled for every following one
+        max_delay (float): Longest wait between two attempts
+
+    Raises:
+        CircuitOpenError: The host's circuit is open
+        UpstreamUnavailableError: Every attempt failed with a retryable error
+        Exception: Any non-retryable error raised by func
+
+    Returns:
+        The value returned by func
+    """
+    for attempt in range(retries + 1):
+        breaker.before_call()
+
+        try:
+            result = func(*args, **kwargs)
+
+        except Exception as err:
+            if not is_retryable(err):
+                if isinstance(err, HTTPError):
+                    # The host answered, e.g. with a 404, so it is up
+                    breaker.record_success()
+                else:
+                    breaker.record_ignored()
+                raise
+
+            if _status_code(err) == 429:
+                breaker.record_ignored()
+            else:
+                breaker.record_failure()
+
+            if attempt == retries:
+                raise UpstreamUnavailableError(f'{breaker.name} unavailable: {err}') from err
+
+            time.sleep(_backoff_delay(err, attempt, base_delay, max_delay))
+
+        else:
+            breaker.record_success()
+            return result
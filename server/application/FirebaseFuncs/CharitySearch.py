@@ -0,0 +1,211 @@
+"""
+In-memory search index over the charity catalog.
+
+The index is built from the first snapshot of an on_snapshot listener on the charity collection and
+then updated incrementally, one changed charity at a time, as the catalog changes. A watchdog thread
+restarts the listener, and so rebuilds the index, whenever the listener stops being active.
+
+Search:
+	- The words of the query are matched against the words of each charity's name and description.
+	  Every query word must match, and matches on prefixes, so "anim shel" finds "Animal Shelter".
+	- Facet filters on category, location and year are exact, case-insensitive matches.
+	- Results are ordered by charity_id and paginated.
+
+Example usage:
+
+	index = CharitySearchIndex(db)
+	index.wait_until_ready(timeout=10)
+	index.search('anim', category='Animals', page=1, page_size=20)
+"""
+from sortedcontainers import SortedList
+import threading
+import re
+
+WORD = re.compile(r'\w+')
+
+FACETS = ('category', 'location', 'year')
+
+
+def _words(text) -> set:
+	return set(WORD.findall(str(text).lower())) if text else set()
+
+
+class CharitySearchIndex:
+	"""
+	Token/prefix and facet index of the charities, kept up to date by a snapshot listener.
+	"""
+
+	def __init__(self, db=None, check_interval: float=30.0) -> None:
+		"""
+		Args:
+			db: The FireStore client. The index is not connected to FireStore if None, see rebuild.
+			check_interval (float): Seconds between two checks that the listener is still active
+		"""
+		self._db = db
+		self._check_interval = check_interval
+		self._lock = threading.Lock()
+		self._charities = {}
+		self._words_by_charity = {}
+		self._charities_by_word = {}
+		self._all_words = SortedList()
+		self._facets = {facet: {} for facet in FACETS}
+		self._ready = threading.Event()
+		self._stopped = threading.Event()
+		self._watch = None
+
+		if db is not None:
+			self._start_listener()
+			threading.Thread(target=self._watch_listener, name='charity-search', daemon=True).start()
+
+
+	@property
+	def ready(self) -> bool:
+		"""True once the catalog has been loaded."""
+		return self._ready.is_set()
+
+
+	def wait_until_ready(self, timeout: float=None) -> bool:
+		return self._ready.wait(timeout)
+
+
+	def close(self) -> None:
+		self._stopped.set()
+		if self._watch is not None:
+			self._watch.unsubscribe()
+
+
+	def search(self, query: str='', category: str=None, location: str=None, year: str=None, page: int=1, page_size: int=20) -> dict:
+		"""
+		Args:
+			query (str): Words to look for in the name and description
+			category (str, optional): Only charities of this category
+			location (str, optional): Only charities at this location
+			year (str, optional): Only charities created this year
+			page (int): 1-based page number
+			page_size (int): Charities per page
+
+		Returns:
+			(dict): {
+						"charities" (list): The charities of the page, as in get_all_charity_info,
+						"total" (int): Number of matching charities,
+						"page" (int), "page_size" (int)
+					}
+		"""
+		with self._lock:
+			matches = None
+
+			for word in _words(query):
+				matches = self._intersect(matches, self._prefix_matches(word))
+
+			for facet, value in zip(FACETS, (category, location, year)):
+				if value:
+					matches = self._intersect(matches, self._facets[facet].get(str(value).lower(), set()))
+
+			if matches is None:
+				matches = self._charities.keys()
+
+			ordered = sorted(matches, key=lambda charity_key: self._sort_key(self._charities[charity_key]))
+			start = (page - 1) * page_size
+
+			return {
+				'charities': [dict(self._charities[charity_key]) for charity_key in ordered[start:start + page_size]],
+				'total': len(ordered),
+				'page': page,
+				'page_size': page_size
+			}
+
+
+	def rebuild(self, charities: dict) -> None:
+		"""Replaces the whole index. charities maps a document path to the charity's data."""
+		with self._lock:
+			for charity_key in list(self._charities):
+				self._remove(charity_key)
+			for charity_key, charity in charities.items():
+				self._add(charity_key, charity)
+		self._ready.set()
+
+
+	def _start_listener(self):
+		self._synced = False
+		self._watch = self._db.collection_group('charity').on_snapshot(self._on_snapshot)
+
+
+	def _watch_listener(self):
+		while not self._stopped.wait(self._check_interval):
+			if self._watch.is_active:
+				continue
+
+			# The listener died, rebuild from a full snapshot
+			self._watch.unsubscribe()
+			self._start_listener()
+
+
+	def _on_snapshot(self, docs, changes, read_time):
+		if not self._synced:
+			self.rebuild({doc.reference.path: doc.to_dict() for doc in docs})
+			self._synced = True
+			return
+
+		with self._lock:
+			for change in changes:
+				charity_key = change.document.reference.path
+				self._remove(charity_key)
+				if change.type.name != 'REMOVED':
+					self._add(charity_key, change.document.to_dict())
+
+
+	def _prefix_matches(self, prefix):
+		matches = set()
+		for word in self._all_words.irange(prefix, prefix + '\uffff'):
+			matches |= self._charities_by_word[word]
+		return matches
+
+
+	@staticmethod
+	def _intersect(matches, new_matches):
+		return set(new_matches) if matches is None else matches & new_matches
+
+
+	@staticmethod
+	def _sort_key(charity):
+		charity_id = charity.get('charity_id')
+		return (charity_id is None, charity_id if isinstance(charity_id, (int, float)) else 0, charity.get('name', ''))
+
+
+	def _add(self, charity_key, charity):
+		self._charities[charity_key] = charity
+
+		words = _words(charity.get('name')) | _words(charity.get('description'))
+		self._words_by_charity[charity_key] = words
+		for word in words:
+			if word not in self._charities_by_word:
+				self._charities_by_word[word] = set()
+				self._all_words.add(word)
+			self._charities_by_word[word].add(charity_key)
+
+		for facet in FACETS:
+			value = charity.get(facet)
+			if value not in (None, ''):
+				self._facets[facet].setdefault(str(value).lower(), set()).add(charity_key)
+
+
+	def _remove(self, charity_key):
+		charity = self._charities.pop(charity_key, None)
+		if charity is None:
+			return
+
+		for word in self._words_by_charity.pop(charity_key):
+			charity_keys = self._charities_by_word[word]
+			charity_keys.discard(charity_key)
+			if not charity_keys:
+				del self._charities_by_word[word]
+				self._all_words.remove(word)
+
+		for facet in FACETS:
+			value = charity.get(facet)
+			if value not in (None, ''):
+				charity_keys = self._facets[facet].get(str(value).lower())
+				if charity_keys is not None:
+					charity_keys.discard(charity_key)
+					if not charity_keys:
+						del self._facets[facet][str(value).lower()]
@@ -0,0 +1,102 @@
+"""
+Compaction of old League of Legends matches into per-player monthly summaries.
+
+'leaguestats' gains one document per user and match. Matches added before a cutoff are rolled up into
+the summaries described in MatchSummaries.py, and their documents are deleted, which bounds the size of
+the collection and of the deduplication queries on it.
+
+Each page of old matches is compacted in one transaction, that reads the summaries it updates, writes
+their new totals and deletes the page's match documents. A match whose id is already in its summary is
+only deleted, so the job can be interrupted and run again without counting a match twice.
+
+Matches whose 'added_at' is still a legacy string are not compacted until migrated (see Timestamps.py).
+
+Example usage:
+
+	compact_league_stats(db, older_than=timedelta(days=90))	# Number of matches compacted
+"""
+from firebase_admin import firestore
+from .MatchSummaries import summary_reference
+from .WriteBehind import match_charity_points
+from .Timestamps import utc_now
+from datetime import timedelta
+
+# Every match of a page takes a delete, and at most one summary write
+MAX_PAGE_SIZE = 250
+
+STAT_FIELDS = ('kills', 'deaths', 'assists')
+
+
+def compact_league_stats(db, older_than: timedelta=timedelta(days=90), page_size: int=200) -> int:
+	"""
+	Rolls the matches added more than older_than ago into monthly summaries.
+
+	Args:
+		db: The FireStore client
+		older_than (timedelta): Age from which matches are compacted
+		page_size (int): Matches compacted per transaction, at most MAX_PAGE_SIZE
+
+	Raises:
+		ValueError: page_size is over MAX_PAGE_SIZE
+
+	Returns:
+		int: Number of matches compacted
+	"""
+	if page_size > MAX_PAGE_SIZE:
+		raise ValueError(f'page_size must be at most {MAX_PAGE_SIZE}.')
+
+	cutoff = utc_now() - older_than
+	query = db.collection('leaguestats').where('added_at', '<', cutoff).order_by('added_at').limit(page_size)
+	compacted = 0
+
+	while True:
+		# Compacted matches are deleted, so every page starts at the beginning again
+		page = query.get()
+		if not page:
+			return compacted
+
+		_compact_page(db.transaction(), db, page)
+		compacted += len(page)
+
+		if len(page) < page_size:
+			return compacted
+
+
+@firestore.transactional
+def _compact_page(transaction, db, matches) -> None:
+	by_summary = {}
+	for match in matches:
+		match_dict = match.to_dict()
+		summary_ref = summary_reference(db, match_dict['playerID'], f"{match_dict['added_at']:%Y-%m}")
+		by_summary.setdefault(summary_ref.path, (summary_ref, []))[1].append(match_dict)
+
+	# All reads must happen before any write in a transaction
+	summaries = {summary.reference.path: summary.to_dict() for summary in transaction.get_all([summary_ref for summary_ref, _ in by_summary.values()]) if summary.exists}
+
+	for summary_path, (summary_ref, match_dicts) in by_summary.items():
+		summary = summaries.get(summary_path)
+		if summary is None:
+			summary = {
+				'playerID': match_dicts[0]['playerID'],
+				'month': summary_ref.id.rsplit('_', 1)[1],
+				'matches': 0, 'kills': 0, 'deaths': 0, 'assists': 0, 'wins': 0, 'points': 0,
+				'match_ids': []
+			}
+
+		summarized = set(summary['match_ids'])
+		for match_dict in match_dicts:
+			if match_dict['match_id'] in summarized:
+				continue
+
+			summarized.add(match_dict['match_id'])
+			summary['match_ids'].append(match_dict['match_id'])
+			summary['matches'] += 1
+			for field in STAT_FIELDS:
+				summary[field] += match_dict[field]
+			summary['wins'] += 1 if match_dict['win_loss'] else 0
+			summary['points'] += match_charity_points(dict(match_dict, win=match_dict['win_loss']))
+
+		transaction.set(summary_ref, summary)
+
+	for match in matches:
+		transaction.delete(match.reference)
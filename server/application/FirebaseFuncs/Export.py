@@ -0,0 +1,180 @@
+"""
+Streaming export of FireStore collections for analytics.
+
+Documents are read page by page, ordered by document id, so only one page is held in memory at a time.
+Incremental exports are range queries on the collection's timestamp field, ordered by that field,
+so documents still holding legacy string times must be migrated first (see Timestamps.py).
+Every exported row is a flat dict:
+	- '_id' holds the document id
+	- References (e.g. 'playerID', 'user', 'game', 'charity') are replaced by the id of the referenced document
+	- Timestamps are written as ISO 8601 strings
+
+Rows are written as JSON Lines, or as Parquet when pyarrow is installed, one chunk at a time.
+
+Example usage:
+
+	with JsonLinesWriter('leaguestats.jsonl') as writer:
+		for rows in stream_documents(db, 'leaguestats', page_size=500):
+			writer.write(rows)
+"""
+from google.cloud.firestore_v1.document import DocumentReference
+from .Timestamps import to_timestamp
+from datetime import datetime
+import json
+
+# Collections that can be exported, and the field recording when each document was added.
+# Incremental exports only include documents added after a given time.
+EXPORTABLE_COLLECTIONS = {
+	'leaguestats': 'added_at',
+	'users': 'created_at',
+	'userplayernames': None,
+	'leaguestatsummaries': None
+}
+
+# Columns of the exported rows of each collection, and their Parquet types.
+# Parquet files are written with these schemas rather than one guessed from the first page.
+EXPORT_FIELDS = {
+	'leaguestats': {
+		'_id': 'string', 'match_id': 'string', 'kills': 'int64', 'assists': 'int64', 'deaths': 'int64',
+		'win_loss': 'bool', 'playerID': 'string', 'added_at': 'string'
+	},
+	'users': {
+		'_id': 'string', 'user_region': 'string', 'charity_points': 'int64', 'created_at': 'string', 'charity': 'string'
+	},
+	'userplayernames': {
+		'_id': 'string', 'game': 'string', 'playerID': 'string', 'user': 'string'
+	},
+	'leaguestatsummaries': {
+		'_id': 'string', 'playerID': 'string', 'month': 'string', 'matches': 'int64', 'kills': 'int64',
+		'deaths': 'int64', 'assists': 'int64', 'wins': 'int64', 'points': 'double', 'match_ids': 'list<string>'
+	}
+}
+
+
+def stream_documents(db, collection_name: str, page_size: int=500, since: datetime=None):
+	"""
+	Yields the documents of a collection as lists of at most page_size flat rows.
+
+	Args:
+		db: The FireStore client
+		collection_name (str): One of EXPORTABLE_COLLECTIONS
+		page_size (int): Documents read per query
+		since (datetime, optional): Only documents added after this time (naive datetimes are UTC)
+
+	Raises:
+		ValueError: The collection cannot be exported, or has no time field for an incremental export
+	"""
+	if collection_name not in EXPORTABLE_COLLECTIONS:
+		raise ValueError(f'Cannot export collection {collection_name}.')
+
+	time_field = EXPORTABLE_COLLECTIONS[collection_name]
+	if since is not None and time_field is None:
+		raise ValueError(f'Collection {collection_name} cannot be exported incrementally.')
+
+	if since is None:
+		query = db.collection(collection_name).order_by('__name__').limit(page_size)
+	else:
+		# Range query on the timestamp, answered from its single-field index
+		query = db.collection(collection_name).where(time_field, '>', to_timestamp(since)).order_by(time_field).limit(page_size)
+
+	last_document = None
+
+	while True:
+		page = query.start_after(last_document).get() if last_document is not None else query.get()
+		if not page:
+			return
+
+		yield [_flatten(document) for document in page]
+
+		if len(page) < page_size:
+			return
+
+		last_document = page[-1]
+
+
+def _flatten(document) -> dict:
+	row = {'_id': document.id}
+
+	for field, value in document.to_dict().items():
+		if isinstance(value, DocumentReference):
+			value = value.id
+		elif isinstance(value, datetime):
+			value = value.isoformat()
+		row[field] = value
+
+	return row
+
+
+class JsonLinesWriter:
+	"""
+	Writes rows to a JSON Lines file, one JSON object per line.
+	"""
+
+	def __init__(self, path: str) -> None:
+		self._file = open(path, 'w', encoding='utf-8')
+		self.rows_written = 0
+
+	def write(self, rows: list) -> None:
+		for row in rows:
+			self._file.write(json.dumps(row) + '\n')
+		self.rows_written += len(rows)
+
+	def close(self) -> None:
+		self._file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+
+class ParquetWriter:
+	"""
+	Writes rows to a Parquet file, one row group per chunk. Requires pyarrow.
+	The columns are given up front, e.g. EXPORT_FIELDS['leaguestats'], so that every chunk has the same
+	schema: fields missing from a row are written as nulls, and a field outside the schema is an error.
+	"""
+
+	def __init__(self, path: str, fields: dict) -> None:
+		"""
+		Args:
+			path (str): Parquet file to write
+			fields (dict): Type of every column, 'string', 'int64', 'double', 'bool' or 'list<string>'
+		"""
+		try:
+			import pyarrow
+			import pyarrow.parquet
+		except ImportError as e:
+			raise ImportError('Parquet export requires pyarrow. Install it with "pip install pyarrow".') from e
+
+		parquet_types = {
+			'string': pyarrow.string(),
+			'int64': pyarrow.int64(),
+			'double': pyarrow.float64(),
+			'bool': pyarrow.bool_(),
+			'list<string>': pyarrow.list_(pyarrow.string())
+		}
+
+		self._pyarrow = pyarrow
+		self._schema = pyarrow.schema([(field, parquet_types[field_type]) for field, field_type in fields.items()])
+		self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+		self.rows_written = 0
+
+	def write(self, rows: list) -> None:
+		for row in rows:
+			unknown_fields = set(row) - set(self._schema.names)
+			if unknown_fields:
+				raise ValueError(f'Fields {sorted(unknown_fields)} of document {row.get("_id")} are not in the export schema.')
+
+		self._writer.write_table(self._pyarrow.Table.from_pylist(rows, schema=self._schema))
+		self.rows_written += len(rows)
+
+	def close(self) -> None:
+		self._writer.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
@@ -19,6 +19,10 @@ An example of this would look like this:
 	fbase.add_charity("My Charity")
 	fbase.set_user_charity("My Charity")
 
+Registration with existing games and charity can also be done at once, writing everything in a single batch:
+
+	fbase.register_user("bob@example.com", "password", {"League of Legends": "my_gamer_handle"}, "My Charity")
+
 A User's token that is provided on authentication with Firebase does expire (default after 1 hr, or 3600 seconds).
 Any method that requires the user to be authenticated will verify that the user's token has not yet expired.
 
@@ -32,17 +36,37 @@ from firebase_admin import firestore, auth
 from firebase_admin._auth_utils import InvalidIdTokenError, UserDisabledError
 from firebase_admin._token_gen import ExpiredIdTokenError, RevokedIdTokenError, CertificateFetchError
 from firebase_admin import exceptions as db_exceptions
-from datetime import datetime
+from google.api_core import exceptions as google_exceptions
+from datetime import datetime, timedelta
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import heapq
+from itertools import islice
 import requests
 from dotenv import load_dotenv
 from os import environ, path
 import copy
+from .WriteBehind import LeagueStatsWriteBehind, match_charity_points, write_league_matches, IN_QUERY_LIMIT
+from .Leaderboard import LiveLeaderboard
+from .Export import stream_documents
+from .Profiles import profile_reference, is_complete
+from .CharitySearch import CharitySearchIndex
+from .Timestamps import utc_now, format_timestamp
+from .LeaderboardWindows import WINDOWS_COLLECTION, window_key, add_window_points
+from .MatchSummaries import summarized_matches_queries, summarized_match_ids
+from .Compaction import compact_league_stats
 
 basedir = path.abspath(path.dirname(__file__))
 load_dotenv(path.join(basedir, ".env"))
 
 API_KEY = environ.get('API_KEY')
+LOGIN_ENDPOINT = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key="
+
+if environ.get('FIREBASE_AUTH_EMULATOR_HOST'):
+	# Sign in against the local Firebase Auth emulator, which accepts any API key
+	LOGIN_ENDPOINT = f"http://{environ['FIREBASE_AUTH_EMULATOR_HOST']}/identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key="
+	API_KEY = API_KEY or 'emulator'
 
 class CurrentUserNotSet(Exception):
 	"""
@@ -111,6 +135,7 @@ class FirebaseFuncs:
 	Contains methods to:
 		Set the current user, whoever is logged in
 		Add a new user
+		Register a new user with their player IDs and charity at once
 		Authenticate and login a user
 		Add points to a user's CharityPoints
 		Set a player's ID (default for LeagueOfLegends)
@@ -118,6 +143,14 @@ class FirebaseFuncs:
 		Set a user's charity
 		Add a Charity	
 		Add LeagueOfLegends matches
+		Buffer LeagueOfLegends matches with a write-behind buffer
+		Serve leaderboards from memory, kept up to date by snapshot listeners
+		Ingest LeagueOfLegends matches for any player, e.g. for a history backfill
+		Export collections for analytics
+		Keep a denormalized profile document per user
+		Search the charities
+		Get weekly and monthly leaderboards
+		Compact old LeagueOfLegends matches into monthly summaries
 
 	Credentials for the Firebase project are required in a file called 'key.json' that should be stored in the same dir as this file.
 	The API key for the Google Authentication service (the WebAPI) must be stored in a .env file in the same dir as this file.
@@ -138,8 +171,83 @@ class FirebaseFuncs:
 		self._current_user_logged_in_time = None
 		self._seconds_until_user_expires = None
 		self._current_user_idToken = None
+		self._write_behind = None
+		self._live_leaderboards = {}
+		self._charity_search = None
+		self._charity_search_lock = threading.Lock()
+		self._region_groups = {}
+		self._region_executor = None
 
 		
+	def enable_write_behind(self, max_items: int=400, max_delay: float=2.0, journal_path: str=None) -> None:
+		"""
+		Buffers the matches added with add_league_matches and writes them, along with the
+		charity points they earn, in large batches. See WriteBehind.LeagueStatsWriteBehind.
+
+		Args:
+			max_items (int): Flush once this many matches are buffered
+			max_delay (float): Flush buffered matches after at most this many seconds
+			journal_path (str, optional): File used to replay buffered matches after a crash
+		"""
+		if self._write_behind is None:
+			self._write_behind = LeagueStatsWriteBehind(self._db, max_items, max_delay, journal_path)
+
+
+	def disable_write_behind(self) -> None:
+		"""Flushes the write-behind buffer, if enabled, and goes back to writing matches directly."""
+		if self._write_behind is not None:
+			self._write_behind.shutdown()
+			self._write_behind = None
+
+
+	def enable_live_leaderboard(self, game_name: str="League of Legends") -> None:
+		"""
+		Keeps the game's leaderboard in memory, fed by FireStore snapshot listeners.
+		get_leaderboard and get_user_leaderboard_rank are then answered without any FireStore read,
+		once the listeners have delivered their first snapshot. See Leaderboard.LiveLeaderboard.
+		Like the leaderboards read from FireStore, it only ranks the players of the leaderboard regions,
+		see set_leaderboard_regions.
+
+		Args:
+			game_name (str, optional): The game's name. Defaults to "League of Legends".
+
+		Raises:
+			firebase_admin.exceptions.NotFoundError: Game not found.
+		"""
+		if game_name not in self._live_leaderboards:
+			self._live_leaderboards[game_name] = LiveLeaderboard(self._db, game_name, regions=self._leaderboard_regions())
+
+
+	def set_leaderboard_regions(self, region_groups: dict) -> None:
+		"""
+		Sets the regions leaderboards are partitioned by, grouped by their regional routing value,
+		e.g. {'AMERICAS': ['North America', 'Brazil'], 'ASIA': ['Korea', 'Japan']}. See RiotWatcher.region_groups.
+		Once set, only the players of these regions are ranked, users can only register with one of them,
+		and the global mini leaderboard is merged from the top players of every region.
+
+		Args:
+			region_groups (dict): Region names, as stored in 'user_region', per regional routing value
+		"""
+		self._region_groups = {group: list(group_regions) for group, group_regions in region_groups.items()}
+
+		# Live leaderboards rank the same players as the leaderboards read from FireStore
+		for live_leaderboard in self._live_leaderboards.values():
+			live_leaderboard.set_regions(self._leaderboard_regions())
+
+		# One thread per region, shared by every request, for the first page of each region
+		if self._region_executor is not None:
+			self._region_executor.shutdown(wait=False)
+		num_regions = sum(len(group_regions) for group_regions in self._region_groups.values())
+		self._region_executor = ThreadPoolExecutor(max_workers=num_regions, thread_name_prefix='leaderboard-region') if num_regions else None
+
+
+	def _leaderboard_regions(self) -> set:
+		"""Every region of the leaderboard region groups, or None if no region groups are set."""
+		if not self._region_groups:
+			return None
+		return {group_region for group_regions in self._region_groups.values() for group_region in group_regions}
+
+
 	def _set_current_user(self, user_id: str):
 		"""
 		Stores the current user's username and the user's FireStore object.
@@ -179,6 +287,97 @@ class FirebaseFuncs:
 		return True
 
 
+	def register_user(self, email: str, password: str, gamer_handles: dict, charity_name: str, region: str='North America') -> dict:
+		"""
+		Registers a new user and logs them in, in a couple of round trips:
+			1. Checks that every game and the charity exist, before anything is written.
+			2. Creates the user for authentication.
+			3. Writes the user document, their player ids, their charity and their profile in one batch.
+			4. Signs the user in, like authenticate_user.
+		If the batch fails, the authentication user is deleted again so that registration can be retried.
+
+		Args:
+			email (str): User's email
+			password (str): User's raw password
+			gamer_handles (dict): The user's player id per game name, e.g. {"League of Legends": "topo"}
+			charity_name (str): Name of the user's charity
+			region (str, optional): The user's region. Defaults to 'North America'.
+
+		Raises:
+			ValueError: The region is not one of the leaderboard regions, see set_leaderboard_regions
+			firebase_admin.exceptions.NotFoundError: A game or the charity does not exist
+			firebase_admin.auth.EmailAlreadyExistsError: If the given email already exists
+			firebase_admin.exceptions.AlreadyExistsError: User document already exists.
+			UserAuthenticationError: The sign in failed
+
+		Returns:
+			dict: Session info, see authenticate_user
+		"""
+		# Validate everything first
+		if self._region_groups and not any(region in group_regions for group_regions in self._region_groups.values()):
+			raise ValueError(f'Unknown region {region}.')
+
+		games = {}
+		game_names = list(gamer_handles)
+		for start in range(0, len(game_names), IN_QUERY_LIMIT):
+			for game in self._db.collection('games').where('name','in', game_names[start:start + IN_QUERY_LIMIT]).get():
+				games[game.to_dict()['name']] = game.reference
+
+		if len(games) != len(gamer_handles):
+			raise db_exceptions.NotFoundError('Game not found.')
+
+		charity = self._db.collection('charity').where('name','==',f'{charity_name}').get()
+
+		if not charity:
+			raise db_exceptions.NotFoundError('Charity not found.')
+
+		charity = charity[0]
+
+		new_user_record = self._auth.create_user(
+			email=email,
+			password=password,
+			email_verified=False
+		)
+
+		new_user = self._db.collection('users').document(f'{new_user_record.uid}')
+		new_user_data = {
+			'user_region': region,
+			'charity_points': 0,
+			'created_at': utc_now(),
+			'charity': charity.reference
+		}
+
+		batch = self._db.batch()
+		# create fails if the user document already exists
+		batch.create(new_user, new_user_data)
+
+		for game_name, player_id in gamer_handles.items():
+			batch.set(self._db.collection('userplayernames').document(), {
+				'game': games[game_name],
+				'playerID': f'{player_id}',
+				'user': new_user
+			})
+
+		batch.set(profile_reference(self._db, new_user), dict(
+			new_user_data,
+			charity=charity.to_dict()['name'],
+			gamer_handles={game_name: f'{player_id}' for game_name, player_id in gamer_handles.items()}
+		))
+
+		try:
+			batch.commit()
+
+		except google_exceptions.AlreadyExists as e:
+			self._auth.delete_user(new_user_record.uid)
+			raise db_exceptions.AlreadyExistsError('User already exists with that unique id.') from e
+
+		except Exception:
+			self._auth.delete_user(new_user_record.uid)
+			raise
+
+		return self.authenticate_user(email, password)
+
+
 	def authenticate_user(self, email: str, password: str) -> dict:
 		"""
 		Signs in a user using the Google auth API endpoint, with the user's email and password.
@@ -200,7 +399,6 @@ class FirebaseFuncs:
 				expiresIn (int): The number of seconds in which the ID token expires
 				currentTime (str): The current time as a datetime object
 		"""
-		LOGIN_ENDPOINT = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key="
 		data = {
 			"email": email,
             "password": password,
@@ -273,14 +471,19 @@ class FirebaseFuncs:
 			raise db_exceptions.AlreadyExistsError('User already exists with that unique id.')
 
 		new_user = self._db.collection('users').document(f'{user_id}')
-		current_time = datetime.utcnow()
 
-		new_user.set({
+		new_user_data = {
 			'user_region': 'North America',
 			'charity_points': 0,
-			'created_at': current_time.strftime("%m/%d/%Y %H:%M:%S"),
+			'created_at': utc_now(),
 			'charity': ''
-		})
+		}
+
+		# The user's profile is created along with the user
+		batch = self._db.batch()
+		batch.set(new_user, new_user_data)
+		batch.set(profile_reference(self._db, new_user), dict(new_user_data, gamer_handles={}))
+		batch.commit()
 
 
 	def verify_user(self) -> bool:
@@ -319,17 +522,78 @@ class FirebaseFuncs:
 
 		return charities
 
-	def get_leaderboard(self, num_of_choices: str, game_name: str="League of Legends") -> dict:
+	def search_charities(self, query: str='', category: str=None, location: str=None, year: str=None, page: int=1, page_size: int=20) -> dict:
+		"""
+		Searches the charities by words or word prefixes of their name and description, and filters them
+		by category, location and year. Answered from an in-memory index that follows catalog changes
+		(see CharitySearch.py). The index is started on the first search.
+
+		Args:
+			query (str): Words to look for in the name and description
+			category (str, optional): Only charities of this category
+			location (str, optional): Only charities at this location
+			year (str, optional): Only charities created this year
+			page (int): 1-based page number
+			page_size (int): Charities per page
+
+		Returns:
+			(dict): {"charities": [charities as in get_all_charity_info], "total": int, "page": int, "page_size": int}
+		"""
+		# Concurrent first searches must not each start their own listener
+		with self._charity_search_lock:
+			if self._charity_search is None:
+				self._charity_search = CharitySearchIndex(self._db)
+
+		index = self._charity_search
+		if not index.wait_until_ready(timeout=2):
+			# Listener not loaded yet, search a one-off index of the catalog
+			index = CharitySearchIndex()
+			index.rebuild({charity.reference.path: charity.to_dict() for charity in self._db.collection_group('charity').get()})
+
+		return index.search(query, category, location, year, page, page_size)
+
+	def get_leaderboard(self, num_of_choices: str, game_name: str="League of Legends", window: str=None, region: str=None) -> dict:
 		"""
 		Requests the 3 highest players with the most charity points.
+		With a window, only the points earned in the current week or month (UTC) count. Those are read
+		from the time-bucketed aggregates of LeaderboardWindows.py, with one indexed query.
+		With a region, only the players of that region, or of every region of that regional routing
+		value, are ranked. Players whose region is not one of the leaderboard regions are on no
+		leaderboard. See set_leaderboard_regions.
 
 		Args:
 			game_name (str): The game name for the leaderboard
 			num_of_choices (str): How many choices requested, either 'mini' or 'complete'
+			window (str, optional): 'week' or 'month'. All-time points if None.
+			region (str, optional): A region, e.g. 'North America', or a regional routing value, e.g. 'AMERICAS'.
+									All regions if None.
+
+		Raises:
+			ValueError: Unknown window or region, or both a window and a region given
 
 		Returns:
 			list: List of dicts containing 3 highest players.
 		"""
+		live_leaderboard = self._live_leaderboards.get(game_name)
+
+		if window is None and region is None and live_leaderboard is not None and live_leaderboard.ready:
+			return live_leaderboard.top(3 if num_of_choices == 'mini' else None)
+
+		# Raise ValueError before any read if the window or the region is unknown
+		if window is not None:
+			if region is not None:
+				raise ValueError('Leaderboard windows are not partitioned by region.')
+			current_window = window_key(window)
+
+		if region is not None:
+			regions = self._region_groups.get(region) or [region for group_regions in self._region_groups.values() if region in group_regions]
+			if not regions:
+				raise ValueError(f'Unknown region {region}.')
+
+		elif num_of_choices == 'mini' and self._region_groups:
+			# Merge the top players of every region rather than ranking every user
+			regions = [group_region for group_regions in self._region_groups.values() for group_region in group_regions]
+
 		game = self._db.collection('games').where('name','==',f'{game_name}').get()
 
 		if not game:
@@ -338,18 +602,34 @@ class FirebaseFuncs:
 		# Since League of Legends is currently only game, there is only one item in the list
 		game = game[0]
 
+		if window is not None:
+			return self._get_window_leaderboard(num_of_choices, game, current_window)
+
+		if region is not None or (num_of_choices == 'mini' and self._region_groups):
+			return self._get_regional_leaderboard(num_of_choices, game, regions)
+
 		all_leaders = self._db.collection_group('users').order_by('charity_points').get()
+		leaderboard_regions = self._leaderboard_regions()
+
+		# Every player handle of the game in one query, instead of one query per user
+		player_handles = {}
+		for summoner_name in self._db.collection('userplayernames').where('game','==', game.reference).get():
+			summoner_name = summoner_name.to_dict()
+			player_handles[summoner_name['user'].path] = summoner_name['playerID']
+
 		leaders = []
 		all_leaders.reverse()
 		for leader in all_leaders:
-			summoner_name = self._db.collection('userplayernames').where('game','==', game.reference).where('user','==', leader.reference).get()
-			
-			if not summoner_name:
+			if leader.reference.path not in player_handles:
 				# Player doesn't play this game
 				continue
 
+			elif leaderboard_regions and leader.to_dict().get('user_region') not in leaderboard_regions:
+				# Same players as the mini leaderboard, which is merged from the leaderboard regions
+				continue
+
 			else:
-				player_handle = summoner_name[0].to_dict()['playerID']
+				player_handle = player_handles[leader.reference.path]
 				charity_points = leader.to_dict()['charity_points']
 				new_leader_dict = {player_handle: charity_points}
 				leaders.append(new_leader_dict)
@@ -359,10 +639,125 @@ class FirebaseFuncs:
 		else:
 			return leaders
 
+	def _get_player_handles(self, handle_query) -> dict:
+		"""
+		Player handle per user document path, of the 'userplayernames' documents of handle_query.
+		"""
+		player_handles = {}
+		for summoner_name in handle_query.get():
+			summoner_name = summoner_name.to_dict()
+			player_handles[summoner_name['user'].path] = summoner_name['playerID']
+		return player_handles
+
+	def _get_regional_leaderboard(self, num_of_choices: str, game, regions: list) -> list:
+		"""
+		Leaderboard of the players of the given regions, in the format of get_leaderboard.
+		For the mini leaderboard, the first page of IN_QUERY_LIMIT users of every region is read concurrently,
+		and the pages are merged. The player handles of the merged users are then read IN_QUERY_LIMIT at a
+		time, reading further pages of a region only when needed, until 3 of them play the game.
+		"""
+		game_handles = self._db.collection('userplayernames').where('game','==', game.reference)
+		region_queries = [self._db.collection('users').where('user_region','==', region).order_by('charity_points', direction=firestore.Query.DESCENDING) for region in regions]
+
+		if num_of_choices != 'mini':
+			# One query per IN_QUERY_LIMIT regions, e.g. one for a regional routing value
+			region_leaders = []
+			for start in range(0, len(regions), IN_QUERY_LIMIT):
+				query = self._db.collection('users').where('user_region','in', regions[start:start + IN_QUERY_LIMIT]).order_by('charity_points', direction=firestore.Query.DESCENDING)
+				region_leaders.append([(-leader.to_dict()['charity_points'], leader.reference.path) for leader in query.get()])
+
+			player_handles = self._get_player_handles(game_handles)
+			return [{player_handles[path]: -points} for points, path in heapq.merge(*region_leaders) if path in player_handles]
+
+		def region_leaders(query, page):
+			while page:
+				for leader in page:
+					yield -leader.to_dict()['charity_points'], leader.reference.path, leader.reference
+				if len(page) < IN_QUERY_LIMIT:
+					return
+				page = query.start_after(page[-1]).limit(IN_QUERY_LIMIT).get()
+
+		first_pages = self._region_executor.map(lambda query: query.limit(IN_QUERY_LIMIT).get(), region_queries)
+
+		# Every region's users are sorted, so merging them sorts the users of all the regions
+		all_leaders = heapq.merge(*[region_leaders(query, page) for query, page in zip(region_queries, first_pages)])
+
+		leaders = []
+		while len(leaders) < 3:
+			candidates = list(islice(all_leaders, IN_QUERY_LIMIT))
+			if not candidates:
+				break
+
+			player_handles = self._get_player_handles(game_handles.where('user','in', [user_ref for _points, _path, user_ref in candidates]))
+			leaders += [{player_handles[path]: -points} for points, path, _user_ref in candidates if path in player_handles]
+
+		return leaders[:3]
+
+	def _get_window_leaderboard(self, num_of_choices: str, game, current_window: str) -> list:
+		"""
+		Leaderboard of the points earned in the given window, in the format of get_leaderboard.
+		Users who earned no points in the window are not on it. For the mini leaderboard, the window is
+		read in pages of IN_QUERY_LIMIT users, with the player handles of each page, until 3 of them play the game.
+		"""
+		window_leaders = self._db.collection(WINDOWS_COLLECTION).where('window','==', current_window).order_by('points', direction=firestore.Query.DESCENDING)
+		game_handles = self._db.collection('userplayernames').where('game','==', game.reference)
+
+		if num_of_choices != 'mini':
+			player_handles = self._get_player_handles(game_handles)
+			leaders = []
+			for leader in window_leaders.get():
+				leader = leader.to_dict()
+				if leader['user'].path in player_handles:
+					leaders.append({player_handles[leader['user'].path]: leader['points']})
+			return leaders
+
+		leaders = []
+		page = window_leaders.limit(IN_QUERY_LIMIT).get()
+		while page:
+			page_leaders = [leader.to_dict() for leader in page]
+			player_handles = self._get_player_handles(game_handles.where('user','in', [leader['user'] for leader in page_leaders]))
+			leaders += [{player_handles[leader['user'].path]: leader['points']} for leader in page_leaders if leader['user'].path in player_handles]
+
+			if len(leaders) >= 3 or len(page) < IN_QUERY_LIMIT:
+				break
+			page = window_leaders.start_after(page[-1]).limit(IN_QUERY_LIMIT).get()
+
+		return leaders[:3]
+
+	@_is_current_user_set_or_expired
+	def get_user_leaderboard_rank(self, game_name: str="League of Legends") -> int:
+		"""
+		Returns the current user's 1-based position on the game's leaderboard. User must be authenticated.
+
+		Args:
+			game_name (str, optional): The game's name. Defaults to "League of Legends".
+
+		Raises:
+			db_exceptions.NotFoundError: The user has no player ID for the game.
+
+		Returns:
+			int: The user's rank
+		"""
+		live_leaderboard = self._live_leaderboards.get(game_name)
+
+		if live_leaderboard is not None and live_leaderboard.ready:
+			rank = live_leaderboard.rank_of(self._current_user_uid)
+
+		else:
+			player_handle, _region = self.get_user_handle_and_region(game_name)
+			leaders = [list(leader.keys())[0] for leader in self.get_leaderboard('complete', game_name)]
+			rank = leaders.index(player_handle) + 1 if player_handle in leaders else None
+
+		if rank is None:
+			raise db_exceptions.NotFoundError('No player ID found. One must be set.')
+
+		return rank
+
 	@_is_current_user_set_or_expired
 	def get_logged_in_user_data(self, game_name: str="League of Legends") -> list:
 		"""
 		Returns the currently logged in user's data. User must be authenticated.
+		Read from the user's profile document, which is built on first read if missing.
 
 		Args:
 			game_name: Current game name
@@ -371,9 +766,18 @@ class FirebaseFuncs:
 			(dict): Containing current user's data, with the following key value pairs:
 						'charity_points' (int): Charity points for the player,
 						'user_region' (str): The current user's region,
-						'created_at' (str): String format for time user was added,
+						'created_at' (str): Time the user was added, as "%m/%d/%Y %H:%M:%S" in UTC,
 						'gamer_handle' (str): Returns the gamer handle
 		"""
+		profile_ref = profile_reference(self._db, self._current_user_object.reference)
+		profile = profile_ref.get().to_dict()
+
+		if is_complete(profile) and game_name in profile['gamer_handles']:
+			profile['gamer_handle'] = profile.pop('gamer_handles')[game_name]
+			profile['created_at'] = format_timestamp(profile['created_at'])
+			return profile
+
+		# No profile yet, build it from the user's documents
 		game = self._db.collection('games').where('name','==',f'{game_name}').get()
 
 		if not game:
@@ -382,14 +786,17 @@ class FirebaseFuncs:
 		# Since League of Legends is currently only game, there is only one item in the list
 		game = game[0]
 
-		current_user_dict = self._current_user_object.to_dict()
+		current_user_dict = self._current_user_object.reference.get().to_dict()
 		summoner_name = self._db.collection('userplayernames').where('game','==', game.reference).where('user','==', self._current_user_object.reference).get()
 		if current_user_dict['charity']:
 			# User charity  set
 			current_user_dict['charity'] = current_user_dict['charity'].get().to_dict()['name']
 
 		user_handle = summoner_name[0].to_dict()['playerID']
+		profile_ref.set(dict(current_user_dict, gamer_handles={game_name: user_handle}), merge=True)
+
 		current_user_dict["gamer_handle"] = user_handle
+		current_user_dict['created_at'] = format_timestamp(current_user_dict['created_at'])
 		return current_user_dict
 
 	@_is_current_user_set_or_expired
@@ -406,12 +813,21 @@ class FirebaseFuncs:
 		if points_to_add < 0:
 			return False
 
-		user_dict = self._current_user_object.to_dict()
-		user_dict['charity_points'] += points_to_add
+		if points_to_add == 0:
+			# Nothing to write, and no zero-point entry on the leaderboard windows
+			return True
 
-		self._current_user_object.reference.update({
-			'charity_points': user_dict['charity_points']
+		# Increment rather than the login-time value plus points_to_add, so that points awarded
+		# meanwhile by a backfill or a write-behind flush are not overwritten
+		batch = self._db.batch()
+		batch.update(self._current_user_object.reference, {
+			'charity_points': firestore.Increment(points_to_add)
 			})
+		batch.set(profile_reference(self._db, self._current_user_object.reference), {
+			'charity_points': firestore.Increment(points_to_add)
+			}, merge=True)
+		add_window_points(batch, self._db, self._current_user_object.reference, points_to_add)
+		batch.commit()
 
 		return True
 
@@ -443,10 +859,11 @@ class FirebaseFuncs:
 
 		# If it already exists, update the current one. Else, create a new player id
 		already_added_player_id = self._db.collection('userplayernames').where('game','==', game.reference).where('user','==', self._current_user_object.reference).get()
-		
+		batch = self._db.batch()
+
 		if not already_added_player_id:
 			# Create new player id since user hasn't created one yet
-			new_player_id = self._db.collection('userplayernames').add({
+			batch.set(self._db.collection('userplayernames').document(), {
 				'game': game.reference,
 				'playerID': f'{player_id}',
 				'user': self._current_user_object.reference
@@ -455,10 +872,15 @@ class FirebaseFuncs:
 		else:
 			# There can only be one player id associated with a specified game and user
 			already_added_player_id = already_added_player_id[0]
-			already_added_player_id.reference.update({
+			batch.update(already_added_player_id.reference, {
 				'playerID': f'{player_id}'
 			})
 
+		batch.set(profile_reference(self._db, self._current_user_object.reference), {
+			'gamer_handles': {game_name: f'{player_id}'}
+		}, merge=True)
+		batch.commit()
+
 		return True
 
 
@@ -512,9 +934,14 @@ class FirebaseFuncs:
 		try:
 			charity = self._db.collection('charity').where('name','==',f'{charity_name}').get()[0]
 			if charity.exists:
-				self._current_user_object.reference.update({
+				batch = self._db.batch()
+				batch.update(self._current_user_object.reference, {
 					'charity': charity.reference
 				})
+				batch.set(profile_reference(self._db, self._current_user_object.reference), {
+					'charity': charity.to_dict()['name']
+				}, merge=True)
+				batch.commit()
 				return True
 		
 		except IndexError:
@@ -577,6 +1004,9 @@ class FirebaseFuncs:
     			'NA1_4256184672': {'assists': 8, 'deaths': 2, 'kills': 1, 'win': True}
 				}
 
+		If the write-behind buffer is enabled, the matches are only buffered here and
+		written (with their charity points) on the buffer's next flush.
+
 		Args:
 			player_id (str): The player's ID for League
 			match_data (dict): Match data for league.
@@ -593,16 +1023,29 @@ class FirebaseFuncs:
 		# As there is only one player id per person per game, there should be only one value in this list
 		player_id_obj = player_id_obj[0]
 
+		if self._write_behind is not None:
+			self._write_behind.enqueue(player_id_obj.reference, self._current_user_object.reference, match_data)
+			return True
+
 		batch = self._db.batch()
-		current_time = datetime.utcnow()
+		current_time = utc_now()
 
 		charity_points = 0
 
+		# Look up the matches already in the database with 'in' queries rather than one query per match
+		match_ids = [f'{match}' for match in match_data]
+		previous_match_ids = set()
+		for start in range(0, len(match_ids), IN_QUERY_LIMIT):
+			previous_matches = self._db.collection('leaguestats').where('playerID','==', player_id_obj.reference).where('match_id','in', match_ids[start:start + IN_QUERY_LIMIT]).get()
+			previous_match_ids.update(previous_match.to_dict()['match_id'] for previous_match in previous_matches)
+
+		# Matches compacted into the player's monthly summaries are already in there too
+		for summaries in summarized_matches_queries(self._db, player_id_obj.reference, match_ids):
+			previous_match_ids.update(summarized_match_ids(summaries.get(), match_ids))
+
 		for match in match_data:
 			# Do not add a match to the database if it's already in there
-			previous_match = self._db.collection('leaguestats').where('playerID','==', player_id_obj.reference).where('match_id','==',f'{match}').get()
-			
-			if previous_match:
+			if f'{match}' in previous_match_ids:
 				continue
 
 			current_match = match_data[match]
@@ -614,18 +1057,160 @@ class FirebaseFuncs:
 				'deaths': current_match['deaths'],
 				'win_loss': current_match['win'],
 				'playerID': player_id_obj.reference,
-				'added_at': current_time.strftime("%m/%d/%Y %H:%M:%S")
+				'added_at': current_time
 			})
 
-			current_match_charity_points = 2 * current_match['kills'] + current_match['assists'] - 0.5 * current_match['deaths']
-
-			if current_match['win']:
-				current_match_charity_points *= 2
-			
-			charity_points += current_match_charity_points
+			charity_points += match_charity_points(current_match)
 
 		batch.commit()
 
 		self.add_points_to_current_user(round(charity_points))
 
 		return True
+
+
+	def get_stored_league_matches(self, player_id: str, num_matches: int=5) -> dict:
+		"""
+		Returns the most recent matches stored for the player, e.g. to answer while the League API is unavailable.
+		Match IDs of a region increase over time, so the most recent matches have the highest IDs.
+
+		Args:
+			player_id (str): The player's ID for League
+			num_matches (int, optional): Number of matches. Defaults to 5.
+
+		Raises:
+			db_exceptions.NotFoundError: No player ID found.
+
+		Returns:
+			dict: Match data in the format given to add_league_matches
+		"""
+		player_id_obj = self._get_player_id_document(player_id)
+		stored_matches = self._db.collection('leaguestats').where('playerID','==', player_id_obj.reference).order_by('match_id', direction=firestore.Query.DESCENDING).limit(num_matches).get()
+
+		match_data = {}
+		for stored_match in stored_matches:
+			stored_match = stored_match.to_dict()
+			match_data[stored_match['match_id']] = {
+				'kills': stored_match['kills'],
+				'deaths': stored_match['deaths'],
+				'assists': stored_match['assists'],
+				'win': stored_match['win_loss']
+			}
+
+		return match_data
+
+
+	def ingest_league_matches(self, player_id: str, match_data: dict) -> int:
+		"""
+		Adds match data to the database for the given player, whoever is logged in.
+		The charity points earned go to the user that owns the player ID.
+		Matches already in the database are skipped, so the same matches can be ingested again safely.
+		Match data has the same format as in add_league_matches. The matches may be old, e.g. for a
+		history backfill, so their points only count for the all-time leaderboard, not for the weekly
+		and monthly ones.
+
+		Args:
+			player_id (str): The player's ID for League
+			match_data (dict): Match data for league.
+
+		Raises:
+			db_exceptions.NotFoundError: No player ID found.
+
+		Returns:
+			int: Number of new matches added
+		"""
+		player_id_obj = self._get_player_id_document(player_id)
+
+		return write_league_matches(self._db, player_id_obj.reference, player_id_obj.to_dict()['user'], match_data, windows=False)
+
+
+	def get_backfill_state(self, player_id: str) -> dict:
+		"""
+		Returns the saved progress of the match history backfill for the given player, or None
+		if no backfill was started for them.
+
+		Args:
+			player_id (str): The player's ID for League
+
+		Returns:
+			dict: {'next_start' (int): Matchlist index to continue from, 'done' (bool), 'max_matches' (int), 'since' (int),
+				   'end_time' (int): Epoch seconds the matchlist is read up to, fixed when the backfill starts}
+		"""
+		player_id_obj = self._get_player_id_document(player_id)
+		state = self._db.collection('backfills').document(player_id_obj.id).get()
+
+		return state.to_dict() if state.exists else None
+
+
+	def set_backfill_state(self, player_id: str, state: dict) -> bool:
+		"""
+		Saves the progress of the match history backfill for the given player.
+
+		Args:
+			player_id (str): The player's ID for League
+			state (dict): See get_backfill_state
+
+		Returns:
+			bool: True if success
+		"""
+		player_id_obj = self._get_player_id_document(player_id)
+		self._db.collection('backfills').document(player_id_obj.id).set(state)
+
+		return True
+
+
+	def _get_player_id_document(self, player_id: str):
+		"""
+		Returns the userplayernames document of the given player ID.
+
+		Raises:
+			db_exceptions.NotFoundError: No player ID found.
+		"""
+		player_id_obj = self._db.collection('userplayernames').where('playerID','==', player_id).get()
+
+		if not player_id_obj:
+			# No valid player ID available, and therefore an empty list
+			raise db_exceptions.NotFoundError('No player ID found. One must be set.')
+
+		# As there is only one player id per person per game, there should be only one value in this list
+		return player_id_obj[0]
+
+
+	def export_collection(self, collection_name: str, writer, page_size: int=500, since: datetime=None) -> int:
+		"""
+		Streams a collection to the given writer in chunks of page_size documents,
+		without loading the whole collection in memory. See Export.py.
+
+		Args:
+			collection_name (str): 'leaguestats', 'users' or 'userplayernames'
+			writer: An Export.JsonLinesWriter or Export.ParquetWriter
+			page_size (int): Documents read and written at a time
+			since (datetime, optional): Only export documents added after this time
+
+		Raises:
+			ValueError: The collection cannot be exported, or not incrementally
+
+		Returns:
+			int: Number of documents exported
+		"""
+		exported = 0
+		for rows in stream_documents(self._db, collection_name, page_size, since):
+			writer.write(rows)
+			exported += len(rows)
+
+		return exported
+
+
+	def compact_league_stats(self, older_than_days: float=90, page_size: int=200) -> int:
+		"""
+		Rolls the League matches added more than older_than_days ago into per-player monthly
+		summaries, and deletes their match documents. See Compaction.py.
+
+		Args:
+			older_than_days (float): Age, in days, from which matches are compacted
+			page_size (int): Matches compacted per transaction
+
+		Returns:
+			int: Number of matches compacted
+		"""
+		return compact_league_stats(self._db, timedelta(days=older_than_days), page_size)
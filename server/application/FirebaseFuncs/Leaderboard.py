@@ -0,0 +1,231 @@
+"""
+In-process leaderboard for one game, kept up to date by FireStore snapshot listeners.
+
+Two listeners feed the leaderboard:
+	- 'users', for every user's charity points
+	- 'userplayernames' for the game, for the player handle of every user that plays it
+
+Only users with a handle for the game are ranked and, once regions are set, only those of these regions,
+like FirebaseFuncs.get_leaderboard does without a live leaderboard. Ranked users are kept in a sorted list, so
+top-K and rank-of-user queries are answered in O(log n) (plus K for top-K) without any network I/O.
+
+The first snapshot delivered by a listener holds every matching document and is used to rebuild
+the leaderboard from scratch. A watchdog thread restarts the listeners, and so resyncs, whenever
+one of them stops being active.
+
+Example usage:
+
+	leaderboard = LiveLeaderboard(db, 'League of Legends')
+	leaderboard.wait_until_ready(timeout=10)
+	leaderboard.top(3) # [{'topo': 692}, {'bob': 12}, {'alice': 0}]
+	leaderboard.rank_of(user_id) # 1
+"""
+from firebase_admin import exceptions as db_exceptions
+from sortedcontainers import SortedList
+import threading
+
+
+class LiveLeaderboard:
+	"""
+	Sorted in-memory leaderboard of a single game, fed by on_snapshot listeners.
+	"""
+
+	def __init__(self, db, game_name: str="League of Legends", check_interval: float=30.0, regions=None) -> None:
+		"""
+		Args:
+			db: The FireStore client
+			game_name (str): The game's name
+			check_interval (float): Seconds between two checks that the listeners are still active
+			regions (iterable, optional): Only rank the users whose 'user_region' is one of these. Every user if None.
+
+		Raises:
+			firebase_admin.exceptions.NotFoundError: Game not found.
+		"""
+		game = db.collection('games').where('name','==',f'{game_name}').get()
+
+		if not game:
+			raise db_exceptions.NotFoundError('Game not found.')
+
+		self._db = db
+		self.game_name = game_name
+		self._game_ref = game[0].reference
+		self._check_interval = check_interval
+
+		self._lock = threading.Lock()
+		self._ranked = SortedList()
+		self._points = {}
+		self._user_regions = {}
+		self._regions = set(regions) if regions is not None else None
+		self._handles = {}
+		self._synced = set()
+		self._ready = threading.Event()
+		self._watches = []
+		self._stopped = threading.Event()
+		self.resyncs = 0
+
+		self._start_listeners()
+		self._watchdog = threading.Thread(target=self._watch_listeners, name=f'leaderboard-{game_name}', daemon=True)
+		self._watchdog.start()
+
+
+	def top(self, k: int=None) -> list:
+		"""
+		Highest ranked players.
+
+		Args:
+			k (int, optional): How many players. All players if None.
+
+		Returns:
+			list: List of dicts {player_handle: charity_points}, highest first
+		"""
+		with self._lock:
+			entries = self._ranked if k is None else self._ranked.islice(0, k)
+			return [{self._handles[user_id]: -negative_points} for negative_points, user_id in entries]
+
+
+	def rank_of(self, user_id: str) -> int:
+		"""
+		Returns the user's 1-based rank, or None if the user does not play this game.
+		Users with the same points share the position of the first of them.
+		"""
+		with self._lock:
+			if not self._is_ranked(user_id):
+				return None
+			return self._ranked.bisect_left((-self._points.get(user_id, 0), '')) + 1
+
+
+	def set_regions(self, regions) -> None:
+		"""Only ranks the users of these regions from now on, or every user if None."""
+		with self._lock:
+			self._regions = set(regions) if regions is not None else None
+			self._ranked = SortedList((-self._points.get(user_id, 0), user_id) for user_id in self._handles if self._is_ranked(user_id))
+
+
+	def __len__(self):
+		return len(self._ranked)
+
+
+	@property
+	def ready(self) -> bool:
+		"""True once both listeners have delivered their first snapshot."""
+		return self._ready.is_set()
+
+
+	def wait_until_ready(self, timeout: float=None) -> bool:
+		return self._ready.wait(timeout)
+
+
+	def close(self) -> None:
+		self._stopped.set()
+		self._stop_listeners()
+
+
+	def _start_listeners(self):
+		with self._lock:
+			self._synced.clear()
+			self._ready.clear()
+
+		users = self._db.collection('users')
+		handles = self._db.collection('userplayernames').where('game', '==', self._game_ref)
+		self._watches = [
+			users.on_snapshot(lambda docs, changes, read_time: self._on_snapshot('users', docs, changes)),
+			handles.on_snapshot(lambda docs, changes, read_time: self._on_snapshot('handles', docs, changes))
+		]
+
+
+	def _stop_listeners(self):
+		for watch in self._watches:
+			watch.unsubscribe()
+		self._watches = []
+
+
+	def _watch_listeners(self):
+		while not self._stopped.wait(self._check_interval):
+			if all(watch.is_active for watch in self._watches):
+				continue
+
+			# A listener died, start over from a full snapshot
+			self._stop_listeners()
+			self._start_listeners()
+			self.resyncs += 1
+
+
+	def _on_snapshot(self, source, docs, changes):
+		with self._lock:
+			if source not in self._synced:
+				self._resync(source, docs)
+				self._synced.add(source)
+				if len(self._synced) == 2:
+					self._ready.set()
+				return
+
+			for change in changes:
+				removed = change.type.name == 'REMOVED'
+				if source == 'users':
+					self._apply_user(change.document, removed)
+				else:
+					self._apply_handle(change.document, removed)
+
+
+	def _resync(self, source, docs):
+		if source == 'users':
+			points = {}
+			user_regions = {}
+			for doc in docs:
+				user = doc.to_dict()
+				points[doc.id] = user.get('charity_points', 0)
+				user_regions[doc.id] = user.get('user_region')
+			self._user_regions = user_regions
+			handles = self._handles
+		else:
+			points = self._points
+			handles = {}
+			for doc in docs:
+				player = doc.to_dict()
+				handles[player['user'].id] = player['playerID']
+
+		self._points = points
+		self._handles = handles
+		self._ranked = SortedList((-points.get(user_id, 0), user_id) for user_id in handles if self._is_ranked(user_id))
+
+
+	def _apply_user(self, doc, removed):
+		user_id = doc.id
+		self._unrank(user_id)
+
+		if removed:
+			self._points.pop(user_id, None)
+			self._user_regions.pop(user_id, None)
+		else:
+			user = doc.to_dict()
+			self._points[user_id] = user.get('charity_points', 0)
+			self._user_regions[user_id] = user.get('user_region')
+
+		self._rank(user_id)
+
+
+	def _apply_handle(self, doc, removed):
+		player = doc.to_dict()
+		user_id = player['user'].id
+		self._unrank(user_id)
+
+		if removed:
+			self._handles.pop(user_id, None)
+		else:
+			self._handles[user_id] = player['playerID']
+
+		self._rank(user_id)
+
+
+	def _is_ranked(self, user_id):
+		return user_id in self._handles and (self._regions is None or self._user_regions.get(user_id) in self._regions)
+
+
+	def _unrank(self, user_id):
+		if self._is_ranked(user_id):
+			self._ranked.discard((-self._points.get(user_id, 0), user_id))
+
+
+	def _rank(self, user_id):
+		if self._is_ranked(user_id):
+			self._ranked.add((-self._points.get(user_id, 0), user_id))
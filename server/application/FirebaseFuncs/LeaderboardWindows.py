@@ -0,0 +1,68 @@
+"""
+Time-bucketed charity point aggregates for weekly and monthly leaderboards.
+
+Every time points are awarded for new matches, they are also added to one 'leaderboardwindows' document
+per window the award falls in, for the user that earns them. A history backfill adds none, since its
+matches were not played in the current windows:
+
+	leaderboardwindows/week-2026-W42_<user id>	{'window': 'week-2026-W42', 'user': <user ref>, 'points': 120}
+	leaderboardwindows/month-2026-10_<user id>	{'window': 'month-2026-10', 'user': <user ref>, 'points': 340}
+
+Weeks are ISO weeks, and all windows are in UTC. A window's leaderboard is then a single indexed query:
+
+	where('window', '==', 'week-2026-W42').order_by('points', direction=DESCENDING).limit(k)
+
+which needs the composite index declared in firestore.indexes.json.
+
+Example usage:
+
+	batch = db.batch()
+	add_window_points(batch, db, user_ref, 120)
+	batch.commit()
+	window_key('month')	# 'month-2026-10'
+"""
+from firebase_admin import firestore
+from datetime import datetime, timezone
+
+WINDOWS_COLLECTION = 'leaderboardwindows'
+WINDOWS = ('week', 'month')
+
+
+def window_key(window: str, moment: datetime=None) -> str:
+	"""
+	Key of the window of the given kind that contains moment (now if None).
+
+	Args:
+		window (str): 'week' or 'month'
+		moment (datetime, optional): Naive datetimes are taken as UTC
+
+	Raises:
+		ValueError: Unknown window
+	"""
+	if moment is None:
+		moment = datetime.now(timezone.utc)
+	elif moment.tzinfo is not None:
+		moment = moment.astimezone(timezone.utc)
+
+	if window == 'week':
+		iso_year, iso_week, _weekday = moment.isocalendar()
+		return f'week-{iso_year}-W{iso_week:02d}'
+
+	if window == 'month':
+		return f'month-{moment:%Y-%m}'
+
+	raise ValueError(f'Unknown leaderboard window {window}.')
+
+
+def add_window_points(writer, db, user_ref, points, moment: datetime=None) -> None:
+	"""
+	Adds the points to every window containing moment, in the given batch or transaction.
+	Takes one write per window.
+	"""
+	for window in WINDOWS:
+		key = window_key(window, moment)
+		writer.set(db.collection(WINDOWS_COLLECTION).document(f'{key}_{user_ref.id}'), {
+			'window': key,
+			'user': user_ref,
+			'points': firestore.Increment(points)
+		}, merge=True)
@@ -0,0 +1,52 @@
+"""
+Per-player monthly summaries of compacted League of Legends matches.
+
+Old 'leaguestats' documents are rolled up by the compaction job (see Compaction.py) into one
+'leaguestatsummaries' document per player and month, with the same id scheme as the match documents:
+
+	leaguestatsummaries/<userplayernames id>_2026-07
+	{
+		'playerID': <userplayernames ref>,
+		'month': '2026-07',		# Month the matches were added, in UTC
+		'matches': 42,
+		'kills': 180, 'deaths': 150, 'assists': 310,
+		'wins': 23,
+		'points': 1204.5,		# Charity points earned by the matches
+		'match_ids': ['NA1_4255177813', ...]
+	}
+
+A compacted match is no longer in 'leaguestats', so deduplication also looks for new match ids in the
+match_ids of the player's summaries, with array-contains-any queries.
+
+Example usage:
+
+	for query in summarized_matches_queries(db, player_ref, match_ids):
+		stored |= summarized_match_ids(query.get(), match_ids)
+"""
+
+SUMMARIES_COLLECTION = 'leaguestatsummaries'
+
+# Firestore 'array-contains-any' filters accept at most 10 values.
+ARRAY_CONTAINS_ANY_LIMIT = 10
+
+
+def summary_reference(db, player_ref, month: str):
+	"""Reference to the summary of the given player's matches added in the given month ('YYYY-MM')."""
+	return db.collection(SUMMARIES_COLLECTION).document(f'{player_ref.id}_{month}')
+
+
+def summarized_matches_queries(db, player_ref, match_ids: list) -> list:
+	"""Queries for the player's summaries holding any of the match ids, one per 10 ids."""
+	return [
+		db.collection(SUMMARIES_COLLECTION).where('playerID', '==', player_ref).where('match_ids', 'array_contains_any', match_ids[start:start + ARRAY_CONTAINS_ANY_LIMIT])
+		for start in range(0, len(match_ids), ARRAY_CONTAINS_ANY_LIMIT)
+	]
+
+
+def summarized_match_ids(summaries, match_ids: list) -> set:
+	"""The match ids, out of the given ones, that are in the given summary snapshots."""
+	summarized = set()
+	for summary in summaries:
+		summarized.update(summary.to_dict()['match_ids'])
+
+	return summarized.intersection(match_ids)
@@ -0,0 +1,34 @@
+"""
+Denormalized user profiles.
+
+A user's data is spread over the 'users' document, their 'userplayernames' documents (one per game) and
+the 'charity' document their user document refers to. Reading it all takes several dependent reads, so
+a projection of it is kept in a single 'userprofiles' document, with the same id as the user document:
+
+	{
+		'user_region': 'North America',
+		'created_at': '03/27/2022 14:02:52',
+		'charity_points': 692,
+		'charity': 'My Charity',		# Charity name, '' if not set
+		'gamer_handles': {'League of Legends': 'topo'}
+	}
+
+The profile is written in the same batch or transaction as the data it mirrors, by every method that
+changes it (registration, set_user_charity, set_user_player_id and point updates).
+Profiles missing for users created before they existed are built on first read.
+"""
+
+PROFILES_COLLECTION = 'userprofiles'
+
+# Fields a profile needs to answer get_logged_in_user_data
+PROFILE_FIELDS = ('user_region', 'created_at', 'charity_points', 'charity', 'gamer_handles')
+
+
+def profile_reference(db, user_ref):
+	"""Reference to the profile document of the given user document."""
+	return db.collection(PROFILES_COLLECTION).document(user_ref.id)
+
+
+def is_complete(profile: dict) -> bool:
+	"""True if every profile field is set, i.e. the profile was not only partially written."""
+	return profile is not None and all(field in profile for field in PROFILE_FIELDS)
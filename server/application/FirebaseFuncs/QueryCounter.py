@@ -0,0 +1,87 @@
+"""
+Counts the FireStore round trips made through a FireStore client.
+
+The counter wraps the RPC methods of the client's underlying FireStore API, so every query, document
+read, batch commit and transaction is counted exactly once, however the code builds it (queries,
+references taken from snapshots, batches or transactions). Snapshot listeners are not counted.
+
+	Reads: run_query, run_aggregation_query, batch_get_documents, get_document, list_documents
+	Writes: commit, batch_write, create_document, update_document, delete_document,
+	        and the begin_transaction / rollback round trips of transactions
+
+Used by check_query_budgets.py to hold every route to a declared round-trip budget.
+
+Example usage:
+
+	counter = QueryCounter(db)
+	with counter.measure() as counts:
+		fbase.get_leaderboard('mini')
+	print(counts.reads, counts.writes)
+"""
+from contextlib import contextmanager
+from functools import wraps
+import threading
+
+READ_METHODS = ('run_query', 'run_aggregation_query', 'batch_get_documents', 'get_document', 'list_documents')
+WRITE_METHODS = ('commit', 'batch_write', 'create_document', 'update_document', 'delete_document', 'begin_transaction', 'rollback')
+
+
+class QueryCounts:
+	"""Round trips counted during one measurement."""
+
+	def __init__(self) -> None:
+		self.reads = 0
+		self.writes = 0
+		self.calls = []
+
+	def __repr__(self):
+		return f'QueryCounts(reads={self.reads}, writes={self.writes})'
+
+
+class QueryCounter:
+	"""
+	Installs counting wrappers on a FireStore client's API. Counts are only kept inside measure().
+	"""
+
+	def __init__(self, db) -> None:
+		self._lock = threading.Lock()
+		self._current = None
+
+		# The API client is created lazily by the FireStore client, so create it now
+		firestore_api = db._firestore_api
+
+		for method_name in READ_METHODS + WRITE_METHODS:
+			method = getattr(firestore_api, method_name, None)
+			if method is not None:
+				setattr(firestore_api, method_name, self._counted(method_name, method))
+
+
+	@contextmanager
+	def measure(self):
+		"""Counts the round trips made inside the with block."""
+		counts = QueryCounts()
+		with self._lock:
+			self._current = counts
+		try:
+			yield counts
+		finally:
+			with self._lock:
+				self._current = None
+
+
+	def _counted(self, method_name, method):
+		is_read = method_name in READ_METHODS
+
+		@wraps(method)
+		def wrapper(*args, **kwargs):
+			with self._lock:
+				counts = self._current
+				if counts is not None:
+					if is_read:
+						counts.reads += 1
+					else:
+						counts.writes += 1
+					counts.calls.append(method_name)
+			return method(*args, **kwargs)
+
+		return wrapper
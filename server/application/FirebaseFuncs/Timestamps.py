@@ -0,0 +1,104 @@
+"""
+Native FireStore timestamps for the 'created_at' and 'added_at' fields.
+
+Documents used to store these times as "%m/%d/%Y %H:%M:%S" strings in UTC, which cannot be range-queried
+or sorted on. They are now written as timezone-aware UTC datetimes, which FireStore stores as timestamps,
+and existing string values are converted by migrate_timestamps (see migrate_timestamps.py).
+
+The API keeps returning times in the legacy string format, see format_timestamp.
+
+Example usage:
+
+	migrate_timestamps(db)		# {'users': 12, 'userprofiles': 12, 'leaguestats': 340}
+	format_timestamp(utc_now())	# '10/19/2026 13:37:00'
+"""
+from datetime import datetime, timezone
+
+LEGACY_TIME_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+# The time fields of each collection
+TIMESTAMP_FIELDS = {
+	'users': 'created_at',
+	'userprofiles': 'created_at',
+	'leaguestats': 'added_at'
+}
+
+
+def utc_now() -> datetime:
+	"""The current time as a timezone-aware UTC datetime."""
+	return datetime.now(timezone.utc)
+
+
+def to_timestamp(value) -> datetime:
+	"""
+	Converts a stored time to a timezone-aware UTC datetime.
+
+	Args:
+		value: A datetime (naive datetimes are UTC), an ISO 8601 string or a legacy "%m/%d/%Y %H:%M:%S" string
+
+	Raises:
+		ValueError: The string is in neither format
+	"""
+	if isinstance(value, str):
+		try:
+			value = datetime.fromisoformat(value)
+		except ValueError:
+			value = datetime.strptime(value, LEGACY_TIME_FORMAT)
+
+	if value.tzinfo is None:
+		return value.replace(tzinfo=timezone.utc)
+
+	return value.astimezone(timezone.utc)
+
+
+def format_timestamp(value) -> str:
+	"""Formats a stored time, timestamp or legacy string, in the legacy UTC string format of the API."""
+	if not value:
+		return value
+
+	return to_timestamp(value).strftime(LEGACY_TIME_FORMAT)
+
+
+def migrate_timestamps(db, page_size: int=400) -> dict:
+	"""
+	Converts the legacy string times of every collection in TIMESTAMP_FIELDS to timestamps.
+	Pages through each collection by document id and updates one batch per page, so it can be
+	stopped and run again at any time: documents already converted are left untouched.
+
+	Args:
+		db: The FireStore client
+		page_size (int): Documents read and updated at a time, at most 500
+
+	Returns:
+		dict: Number of documents converted per collection
+	"""
+	migrated = {}
+
+	for collection_name, field in TIMESTAMP_FIELDS.items():
+		query = db.collection(collection_name).order_by('__name__').limit(page_size)
+		last_document = None
+		migrated[collection_name] = 0
+
+		while True:
+			page = query.start_after(last_document).get() if last_document is not None else query.get()
+			if not page:
+				break
+
+			batch = db.batch()
+			converted = 0
+			for document in page:
+				value = document.to_dict().get(field)
+				if isinstance(value, str) and value:
+					batch.update(document.reference, {field: to_timestamp(value)})
+					converted += 1
+
+			if converted:
+				batch.commit()
+				migrated[collection_name] += converted
+
+			if len(page) < page_size:
+				break
+
+			last_document = page[-1]
+
+	return migrated
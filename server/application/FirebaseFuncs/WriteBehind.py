@@ -0,0 +1,361 @@
+"""
+Write-behind buffer for League of Legends match ingestion.
+
+Instead of committing a small batch and a separate points update for every request, matches are
+collected in memory and written in large transactions once the buffer reaches a size threshold or
+has been waiting for longer than a time threshold.
+
+Every flush is idempotent:
+	- A match document has a deterministic id ('<userplayernames id>_<match id>').
+	- Inside the flush transaction, matches that are already stored for the player, or compacted
+	  into their monthly summaries (see MatchSummaries.py), are skipped,
+	  and points are only awarded for the matches that are actually inserted.
+	- As with add_points_to_current_user, a user whose new matches total fewer than zero points gets none.
+	- The match documents and the point increments, including those of the weekly and monthly
+	  leaderboard windows, are committed in the same transaction.
+So replaying a flush, or a journal after a crash, can never award the same match twice.
+
+When a journal path is given, every buffered request is appended to it before it is acknowledged,
+and the journal is replayed when the buffer is created again after a crash.
+
+Example usage:
+
+	buffer = LeagueStatsWriteBehind(db, max_items=400, max_delay=2.0, journal_path='leaguestats.journal')
+	buffer.enqueue(player_id_ref, user_ref, {'NA1_4255177813': {'assists': 14, 'deaths': 5, 'kills': 4, 'win': True}})
+	...
+	buffer.shutdown() # Final flush
+"""
+from firebase_admin import firestore
+from .Profiles import profile_reference
+from .Timestamps import utc_now, to_timestamp
+from .LeaderboardWindows import WINDOWS, add_window_points
+from .MatchSummaries import summarized_matches_queries, summarized_match_ids
+import threading
+import logging
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# A Firestore transaction holds at most 500 writes. Besides its matches, a chunk writes the point
+# increments of each of its users: on the user, their profile and every leaderboard window.
+MAX_WRITES_PER_TRANSACTION = 500
+WRITES_PER_USER = 2 + len(WINDOWS)
+MAX_MATCHES_PER_TRANSACTION = 400
+
+# Longest wait between two retries of a failed flush, in seconds
+MAX_RETRY_DELAY = 60.0
+
+# Firestore 'in' filters accept at most 10 values.
+IN_QUERY_LIMIT = 10
+
+
+def match_charity_points(match: dict) -> float:
+	"""
+	Charity points earned for a single match:
+		2 * kills + assists - 0.5 * deaths, doubled on a win.
+	"""
+	points = 2 * match['kills'] + match['assists'] - 0.5 * match['deaths']
+
+	if match['win']:
+		points *= 2
+
+	return points
+
+
+class LeagueStatsWriteBehind:
+	"""
+	Buffers match inserts and point increments and flushes them in batches from a background thread.
+	"""
+
+	def __init__(self, db, max_items: int=MAX_MATCHES_PER_TRANSACTION, max_delay: float=2.0, journal_path: str=None) -> None:
+		"""
+		Args:
+			db: The FireStore client
+			max_items (int): Flush as soon as this many matches are buffered
+			max_delay (float): Flush buffered matches after at most this many seconds
+			journal_path (str, optional): File used to survive a crash. No journal if None.
+		"""
+		self._db = db
+		self._max_items = max_items
+		self._max_delay = max_delay
+		self._journal_path = journal_path
+		self._pending = {}
+		self._flush_lock = threading.Lock()
+		self._condition = threading.Condition()
+		self._stopped = False
+
+		if journal_path:
+			self._recover()
+
+		self._thread = threading.Thread(target=self._run, name='leaguestats-write-behind', daemon=True)
+		self._thread.start()
+
+
+	def enqueue(self, player_ref, user_ref, match_data: dict) -> None:
+		"""
+		Buffers the matches of one player. Same format as FirebaseFuncs.add_league_matches.
+
+		Args:
+			player_ref: Reference to the player's userplayernames document
+			user_ref: Reference to the user document that earns the points
+			match_data (dict): {Match_ID: {'assists': int, 'deaths': int, 'kills': int, 'win': bool}}
+		"""
+		entries = _match_entries(player_ref, user_ref, match_data)
+
+		with self._condition:
+			if self._stopped:
+				raise RuntimeError('Write-behind buffer has been shut down.')
+
+			self._journal(entries)
+			self._add_pending(entries)
+
+			if len(self._pending) >= self._max_items:
+				self._condition.notify()
+
+
+	def flush(self) -> int:
+		"""
+		Writes everything that is currently buffered.
+
+		Returns:
+			int: Number of new matches written
+		"""
+		with self._flush_lock:
+			with self._condition:
+				entries = list(self._pending.values())
+
+			written = 0
+			for chunk in _chunks(entries):
+				written += _write_chunk(self._db.transaction(), self._db, chunk)
+
+				with self._condition:
+					for entry in chunk:
+						key = (entry['player'], entry['match_id'])
+						if self._pending.get(key) is entry:
+							del self._pending[key]
+
+			with self._condition:
+				self._rewrite_journal()
+
+			return written
+
+
+	def shutdown(self) -> None:
+		"""Stops the background thread and performs a final flush."""
+		with self._condition:
+			self._stopped = True
+			self._condition.notify()
+
+		self._thread.join()
+		self.flush()
+
+
+	def _run(self):
+		failures = 0
+		while True:
+			with self._condition:
+				if failures:
+					# Back off after a failed flush, even when the buffer is full, until shut down
+					retry_at = time.monotonic() + min(self._max_delay * 2 ** (failures - 1), MAX_RETRY_DELAY)
+					while not self._stopped and time.monotonic() < retry_at:
+						self._condition.wait(retry_at - time.monotonic())
+
+				elif not self._stopped and len(self._pending) < self._max_items:
+					self._condition.wait(self._max_delay)
+
+				if self._stopped:
+					return
+
+				if not self._pending:
+					continue
+
+			try:
+				self.flush()
+				failures = 0
+			except Exception:
+				# Entries stay buffered (and journaled) and are retried on the next flush
+				failures += 1
+				logger.exception('Flushing %d buffered matches failed (attempt %d), retrying later.', len(self._pending), failures)
+
+
+	def _add_pending(self, entries):
+		for entry in entries:
+			self._pending[(entry['player'], entry['match_id'])] = entry
+
+
+	def _journal(self, entries):
+		if not self._journal_path:
+			return
+
+		with open(self._journal_path, 'a') as journal:
+			for entry in entries:
+				journal.write(json.dumps(entry) + '\n')
+			journal.flush()
+			os.fsync(journal.fileno())
+
+
+	def _rewrite_journal(self):
+		if not self._journal_path:
+			return
+
+		temp_path = self._journal_path + '.tmp'
+		with open(temp_path, 'w') as journal:
+			for entry in self._pending.values():
+				journal.write(json.dumps(entry) + '\n')
+			journal.flush()
+			os.fsync(journal.fileno())
+		os.replace(temp_path, self._journal_path)
+
+
+	def _recover(self):
+		if not os.path.exists(self._journal_path):
+			return
+
+		entries = []
+		with open(self._journal_path) as journal:
+			for line in journal:
+				try:
+					entries.append(json.loads(line))
+				except ValueError:
+					# Partially written last line from a crash
+					continue
+
+		self._add_pending(entries)
+
+
+def write_league_matches(db, player_ref, user_ref, match_data: dict, windows: bool=True) -> int:
+	"""
+	Writes matches right away, with the same idempotent transactions as a buffer flush.
+	Matches that are already stored are skipped and earn no points.
+
+	Args:
+		db: The FireStore client
+		player_ref: Reference to the player's userplayernames document
+		user_ref: Reference to the user document that earns the points
+		match_data (dict): {Match_ID: {'assists': int, 'deaths': int, 'kills': int, 'win': bool}}
+		windows (bool, optional): Also add the points to the current leaderboard windows. False for old
+								  matches, e.g. a history backfill, which were not played in the current windows.
+
+	Returns:
+		int: Number of new matches written
+	"""
+	entries = _match_entries(player_ref, user_ref, match_data)
+	written = 0
+
+	for chunk in _chunks(entries):
+		written += _write_chunk(db.transaction(), db, chunk, windows)
+
+	return written
+
+
+def _match_entries(player_ref, user_ref, match_data):
+	# ISO string, so that entries can be journaled as JSON
+	added_at = utc_now().isoformat()
+	entries = []
+
+	for match_id, match in match_data.items():
+		entries.append({
+			'player': player_ref.path,
+			'user': user_ref.path,
+			'match_id': f'{match_id}',
+			'kills': match['kills'],
+			'assists': match['assists'],
+			'deaths': match['deaths'],
+			'win': match['win'],
+			'added_at': added_at
+		})
+
+	return entries
+
+
+def _chunks(entries):
+	"""
+	Splits entries into chunks that fit in one transaction: at most MAX_MATCHES_PER_TRANSACTION matches,
+	and at most MAX_WRITES_PER_TRANSACTION writes counting the point increments of the chunk's users.
+	"""
+	chunk = []
+	users = set()
+
+	for entry in entries:
+		new_users = len(users | {entry['user']})
+		if chunk and (len(chunk) >= MAX_MATCHES_PER_TRANSACTION or len(chunk) + 1 + WRITES_PER_USER * new_users > MAX_WRITES_PER_TRANSACTION):
+			yield chunk
+			chunk = []
+			users = set()
+
+		chunk.append(entry)
+		users.add(entry['user'])
+
+	if chunk:
+		yield chunk
+
+
+@firestore.transactional
+def _write_chunk(transaction, db, entries, windows=True) -> int:
+	"""
+	Writes one chunk of buffered matches in a single transaction, skipping matches that are
+	already stored. Returns the number of matches written. The points are added to the current
+	leaderboard windows too, unless windows is False.
+	"""
+	by_player = {}
+	for entry in entries:
+		by_player.setdefault(entry['player'], []).append(entry)
+
+	# All reads must happen before any write in a transaction
+	stored = set()
+	for player_path, player_entries in by_player.items():
+		player_ref = db.document(player_path)
+		match_ids = [entry['match_id'] for entry in player_entries]
+
+		for start in range(0, len(match_ids), IN_QUERY_LIMIT):
+			previous_matches = db.collection('leaguestats').where('playerID', '==', player_ref).where('match_id', 'in', match_ids[start:start + IN_QUERY_LIMIT])
+			for previous_match in transaction.get(previous_matches):
+				stored.add((player_path, previous_match.to_dict()['match_id']))
+
+		# Matches compacted into the player's monthly summaries
+		for summaries in summarized_matches_queries(db, player_ref, match_ids):
+			for match_id in summarized_match_ids(transaction.get(summaries), match_ids):
+				stored.add((player_path, match_id))
+
+	points_per_user = {}
+	written = 0
+	for player_path, player_entries in by_player.items():
+		player_ref = db.document(player_path)
+
+		for entry in player_entries:
+			if (player_path, entry['match_id']) in stored:
+				continue
+
+			new_match_for_db = db.collection('leaguestats').document(f"{player_ref.id}_{entry['match_id']}")
+			transaction.set(new_match_for_db, {
+				'match_id': entry['match_id'],
+				'kills': entry['kills'],
+				'assists': entry['assists'],
+				'deaths': entry['deaths'],
+				'win_loss': entry['win'],
+				'playerID': player_ref,
+				'added_at': to_timestamp(entry['added_at'])
+			})
+			points_per_user[entry['user']] = points_per_user.get(entry['user'], 0) + match_charity_points(entry)
+			written += 1
+
+	for user_path, charity_points in points_per_user.items():
+		charity_points = round(charity_points)
+		if charity_points <= 0:
+			# Same rule as FirebaseFuncs.add_points_to_current_user: points are never taken away, and
+			# users who earned none are not added to the leaderboard windows
+			continue
+
+		user_ref = db.document(user_path)
+		transaction.update(user_ref, {
+			'charity_points': firestore.Increment(charity_points)
+		})
+		transaction.set(profile_reference(db, user_ref), {
+			'charity_points': firestore.Increment(charity_points)
+		}, merge=True)
+		if windows:
+			add_window_points(transaction, db, user_ref, charity_points)
+
+	return written
@@ -0,0 +1,105 @@
+"""
+Compact in-memory representation of per-player match stats.
+
+get_player_match_stats returns a dict of dicts:
+
+    {'NA1_4255177813': {'kills': 4, 'deaths': 5, 'assists': 14, 'win': True}, ...}
+
+That costs two dicts per match, which adds up when match histories are kept in memory for many
+players. This module provides two cheaper forms:
+
+MatchStats
+    A single match, stored in a __slots__ object.
+
+MatchHistory
+    All matches of one player, stored column-wise: the match IDs in a list, kills/deaths/assists
+    in typed arrays and wins in a bytearray. Converts to and from the dict form.
+
+Example usage:
+
+    history = MatchHistory.from_stats(get_player_match_stats(puuid, "North America", matches, "kills", "deaths", "assists", "win"))
+    history.append('NA1_4256184672', kills=1, deaths=2, assists=8, win=True)
+    json.dumps(history.to_dict()) # Same shape as get_player_match_stats
+
+See benchmarks/match_stats_memory.py for a memory comparison with the dict form.
+"""
+
+from array import array
+
+
+class MatchStats:
+    """
+    Stats for one match of one player.
+    """
+    __slots__ = ('match_id', 'kills', 'deaths', 'assists', 'win')
+
+    def __init__(self, match_id, kills, deaths, assists, win):
+        self.match_id = match_id
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.win = win
+
+    def to_dict(self):
+        """Returns the stats in the per-match dict form, without the match ID."""
+        return {'kills': self.kills, 'deaths': self.deaths, 'assists': self.assists, 'win': self.win}
+
+    def __repr__(self):
+        return (f'MatchStats({self.match_id!r}, kills={self.kills}, deaths={self.deaths}, '
+                f'assists={self.assists}, win={self.win})')
+
+    def __eq__(self, other):
+        if not isinstance(other, MatchStats):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+
+class MatchHistory:
+    """
+    Column-oriented match history for one player. Matches keep their insertion order.
+    """
+    __slots__ = ('match_ids', 'kills', 'deaths', 'assists', 'wins')
+
+    def __init__(self):
+        self.match_ids = []
+        self.kills = array('H')
+        self.deaths = array('H')
+        self.assists = array('H')
+        self.wins = bytearray()
+
+    @classmethod
+    def from_stats(cls, stats):
+        """
+        Builds a history from the dict returned by get_player_match_stats.
+        The stats must include kills, deaths, assists and win.
+        """
+        history = cls()
+        for match_id, match in stats.items():
+            history.append(match_id, match['kills'], match['deaths'], match['assists'], match['win'])
+        return history
+
+    def append(self, match_id, kills, deaths, assists, win):
+        self.match_ids.append(match_id)
+        self.kills.append(kills)
+        self.deaths.append(deaths)
+        self.assists.append(assists)
+        self.wins.append(1 if win else 0)
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def __getitem__(self, index):
+        return MatchStats(self.match_ids[index], self.kills[index], self.deaths[index],
+                          self.assists[index], bool(self.wins[index]))
+
+    def __iter__(self):
+        for index in range(len(self.match_ids)):
+            yield self[index]
+
+    def to_dict(self):
+        """Returns the history in the same shape as get_player_match_stats."""
+        return {
+            match_id: {'kills': kills, 'deaths': deaths, 'assists': assists, 'win': bool(win)}
+            for match_id, kills, deaths, assists, win
+            in zip(self.match_ids, self.kills, self.deaths, self.assists, self.wins)
+        }
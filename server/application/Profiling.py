@@ -0,0 +1,87 @@
+"""
+On-demand request profiling.
+
+ProfilingMiddleware wraps the Flask WSGI app and runs a request under cProfile when either:
+    - the request carries the header "X-Profile: <PROFILE_TOKEN>", or
+    - it is picked by sampling, with probability PROFILE_SAMPLE_RATE.
+
+The profile is written as a pstats file to PROFILE_DIR, named after the time, method, path and
+duration of the request. Open it with pstats, snakeviz, or turn it into a flamegraph with flameprof
+(e.g. "flameprof profiles/<file>.prof > flame.svg").
+
+Settings are read from the environment (or the .env file):
+
+    PROFILE_TOKEN        -- value of the X-Profile header that turns profiling on (header ignored if unset)
+    PROFILE_SAMPLE_RATE  -- fraction of requests profiled, between 0 and 1 (default 0)
+    PROFILE_DIR          -- directory for the .prof files (default "profiles")
+
+When a request is not profiled, the only cost is a header lookup and, if sampling is on, one random number.
+Only one request is profiled at a time, since cProfile cannot profile concurrent requests reliably.
+
+Example usage:
+
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+
+    curl -H "X-Profile: $PROFILE_TOKEN" http://localhost:8080/api/get_user_league_games
+"""
+
+from datetime import datetime
+import cProfile
+import threading
+import random
+import time
+import os
+import re
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware that profiles selected requests.
+    """
+
+    def __init__(self, wsgi_app, token=None, sample_rate=None, output_dir=None):
+        self.wsgi_app = wsgi_app
+        self.token = token if token is not None else os.environ.get('PROFILE_TOKEN')
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+        self.output_dir = output_dir or os.environ.get('PROFILE_DIR', 'profiles')
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ) or not self._lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self._lock.release()
+
+    def _should_profile(self, environ):
+        if self.token and environ.get('HTTP_X_PROFILE') == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _profile(self, environ, start_response):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+
+        profiler.enable()
+        try:
+            # Consume the response inside the profiler so that streamed bodies are profiled too
+            response = self.wsgi_app(environ, start_response)
+            try:
+                body = list(response)
+            finally:
+                if hasattr(response, 'close'):
+                    response.close()
+        finally:
+            profiler.disable()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._dump(profiler, environ, elapsed_ms)
+        return body
+
+    def _dump(self, profiler, environ, elapsed_ms):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+        file_name = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{environ.get('REQUEST_METHOD', 'GET')}-{path}-{elapsed_ms:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(self.output_dir, file_name))
@@ -0,0 +1,162 @@
+"""
+Short-TTL response cache with stale-while-revalidate for read-heavy routes.
+
+A cached route is keyed by its path and the given query arguments. Within the TTL the cached
+response is returned as is. Once the TTL has passed, the stale response is still returned right away,
+and a single background thread recomputes it; every other caller keeps getting the stale response
+until the refresh is done. Only the very first request for a key waits for the route itself.
+
+Entries that have been stale for longer than max_stale are recomputed in the request instead, so a
+route that is rarely called does not serve very old data.
+
+Only successful (200) responses are cached.
+
+Example usage:
+
+    @app.route("/api/get_all_charities")
+    @cached_response(ttl=60)
+    def get_all_charities():
+        ...
+
+    @app.route("/api/get_leaderboard")
+    @cached_response(ttl=5, key_args=('game', 'num_of_choices'))
+    def get_leaderboard():
+        ...
+"""
+
+from flask import request, current_app
+from functools import wraps
+import threading
+import time
+
+
+class _Entry:
+    __slots__ = ('response', 'created_at', 'refreshing')
+
+    def __init__(self, response, created_at):
+        self.response = response
+        self.created_at = created_at
+        self.refreshing = False
+
+
+class ResponseCache:
+    """
+    Thread-safe store of route responses with stale-while-revalidate refreshes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute, ttl, max_stale):
+        """
+        Returns the cached response for key, calling compute() when there is none.
+
+        Args:
+            key (hashable): Cache key
+            compute (callable): Produces the response, a (body, status, headers) tuple
+            ttl (float): Seconds during which a response is fresh
+            max_stale (float): Seconds after the TTL during which a stale response is still served
+
+        Returns:
+            The response
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.created_at
+                if age < ttl:
+                    self.hits += 1
+                    return entry.response
+
+                if age < ttl + max_stale:
+                    self.stale_hits += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(target=self._refresh, args=(key, entry, compute), daemon=True).start()
+                    return entry.response
+
+            self.misses += 1
+
+        response = compute()
+        self._store(key, response)
+        return response
+
+    def invalidate(self, key=None):
+        """Drops the entry for key, or every entry if key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _refresh(self, key, entry, compute):
+        try:
+            response = compute()
+        except Exception:
+            # Keep serving the stale response, the next stale hit retries
+            with self._lock:
+                entry.refreshing = False
+            return
+
+        if not self._store(key, response):
+            with self._lock:
+                entry.refreshing = False
+
+    def _store(self, key, response):
+        if _status(response) != 200:
+            return False
+
+        with self._lock:
+            self._entries[key] = _Entry(response, time.monotonic())
+        return True
+
+
+def _status(response):
+    if isinstance(response, tuple) and len(response) > 1:
+        return response[1]
+    return getattr(response, 'status_code', 200)
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(ttl, key_args=(), max_stale=None, cache=response_cache):
+    """
+    Caches a route's response, keyed by the route's path and the given query arguments.
+
+    Args:
+        ttl (float): Seconds during which a response is served without recomputing it
+        key_args (tuple): Query arguments the response depends on
+        max_stale (float, optional): Seconds after the TTL during which a stale response is served
+                                     while it is refreshed. Defaults to 10 times the TTL.
+        cache (ResponseCache, optional): The cache to use
+    """
+    if max_stale is None:
+        max_stale = 10 * ttl
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return func(*args, **kwargs)
+
+            key = (request.path,) + tuple(request.args.get(arg) for arg in key_args)
+            # The refresh thread runs outside of the request, so it needs its own request context
+            app = current_app._get_current_object()
+            environ = request.environ.copy()
+
+            def compute():
+                with app.request_context(environ):
+                    return func(*args, **kwargs)
+
+            return cache.get_or_compute(key, compute, ttl, max_stale)
+
+        return wrapper
+
+    return decorator
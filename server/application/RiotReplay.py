@@ -0,0 +1,154 @@
+"""
+Record and replay of the Riot API calls made through lol_watcher.
+
+RecordingWatcher wraps a LolWatcher: every call (e.g. lol_watcher.match.by_id(...)) goes to Riot as
+usual, and its response, or its HTTP error status, is saved with the time it took to a gzip-compressed
+JSON file of a corpus directory, one file per distinct call.
+
+ReplayWatcher serves the same calls from a corpus without any network access, optionally sleeping
+for the recorded time of each call (scaled by latency_scale) to emulate Riot's latency. Recorded HTTP
+errors are raised again as ApiError, so retries and circuit breakers behave as they did when recording.
+
+RiotWatcher uses them when one of these is set in the environment (or the .env file):
+
+    RIOT_RECORD_DIR          -- record every call to this corpus directory
+    RIOT_REPLAY_DIR          -- replay every call from this corpus directory, no API key needed
+    RIOT_REPLAY_LATENCY      -- latency_scale of the replay (default 0, no latency; 1 is the recorded latency)
+
+Example usage:
+
+    lol_watcher = RecordingWatcher(LolWatcher(YOUR_RIOT_API_KEY), 'corpus')
+    lol_watcher.match.by_id('AMERICAS', 'NA1_4255177813') # Called and saved to corpus/
+
+    lol_watcher = ReplayWatcher('corpus', latency_scale=1.0)
+    lol_watcher.match.by_id('AMERICAS', 'NA1_4255177813') # Served from corpus/ after the recorded latency
+"""
+
+from riotwatcher import ApiError
+from requests import Response
+import hashlib
+import json
+import gzip
+import time
+import os
+
+
+class ReplayMissError(LookupError):
+    """The replayed call was not recorded in the corpus."""
+    pass
+
+
+class RiotCorpus:
+    """
+    Directory of recorded calls. A call is identified by its endpoint method (e.g. 'match.by_id')
+    and its arguments, and stored in '<method>-<hash of the arguments>.json.gz'.
+    """
+
+    def __init__(self, corpus_dir):
+        self.corpus_dir = corpus_dir
+        os.makedirs(corpus_dir, exist_ok=True)
+
+    def save(self, call, args, kwargs, response=None, status=None, elapsed=0.0):
+        record = {
+            'call': call,
+            'args': list(args),
+            'kwargs': kwargs,
+            'response': response,
+            'status': status,
+            'elapsed': elapsed
+        }
+        path = self._path(call, args, kwargs)
+
+        # Write then rename, so that a concurrent replay never reads a partial file
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as record_file:
+            json.dump(record, record_file)
+        os.replace(temp_path, path)
+
+    def load(self, call, args, kwargs):
+        try:
+            with gzip.open(self._path(call, args, kwargs), 'rt', encoding='utf-8') as record_file:
+                return json.load(record_file)
+        except FileNotFoundError:
+            raise ReplayMissError(f'{call}{tuple(args)} {kwargs} was not recorded in {self.corpus_dir}.') from None
+
+    def __iter__(self):
+        """Every recorded call, as saved by save."""
+        for file_name in sorted(os.listdir(self.corpus_dir)):
+            if file_name.endswith('.json.gz'):
+                with gzip.open(os.path.join(self.corpus_dir, file_name), 'rt', encoding='utf-8') as record_file:
+                    yield json.load(record_file)
+
+    def _path(self, call, args, kwargs):
+        key = json.dumps([list(args), kwargs], sort_keys=True, default=str)
+        return os.path.join(self.corpus_dir, f'{call}-{hashlib.sha1(key.encode()).hexdigest()[:20]}.json.gz')
+
+
+class RecordingWatcher:
+    """
+    Proxy of a LolWatcher that records every call it makes to a corpus.
+    """
+
+    def __init__(self, watcher, corpus_dir):
+        self._watcher = watcher
+        self.corpus = RiotCorpus(corpus_dir)
+
+    def __getattr__(self, endpoint):
+        return _Endpoint(endpoint, self._record)
+
+    def _record(self, call, *args, **kwargs):
+        endpoint, method = call.split('.')
+        func = getattr(getattr(self._watcher, endpoint), method)
+
+        start = time.perf_counter()
+        try:
+            response = func(*args, **kwargs)
+        except ApiError as err:
+            if err.response is not None:
+                self.corpus.save(call, args, kwargs, status=err.response.status_code, elapsed=time.perf_counter() - start)
+            raise
+
+        self.corpus.save(call, args, kwargs, response=response, elapsed=time.perf_counter() - start)
+        return response
+
+
+class ReplayWatcher:
+    """
+    Stand-in for a LolWatcher that answers every call from a recorded corpus.
+    """
+
+    def __init__(self, corpus_dir, latency_scale=0.0):
+        """
+        corpus_dir -- Directory recorded by a RecordingWatcher
+        latency_scale -- Each call sleeps for its recorded time multiplied by latency_scale (0 for no latency)
+        """
+        self.corpus = RiotCorpus(corpus_dir)
+        self.latency_scale = latency_scale
+
+    def __getattr__(self, endpoint):
+        return _Endpoint(endpoint, self._replay)
+
+    def _replay(self, call, *args, **kwargs):
+        record = self.corpus.load(call, args, kwargs)
+
+        if self.latency_scale:
+            time.sleep(record['elapsed'] * self.latency_scale)
+
+        if record['status'] is not None:
+            response = Response()
+            response.status_code = record['status']
+            raise ApiError(f"{record['status']} Error replayed from {self.corpus.corpus_dir}", response=response)
+
+        return record['response']
+
+
+class _Endpoint:
+    """An endpoint of the watcher (e.g. lol_watcher.match), whose methods all go through handler."""
+
+    def __init__(self, endpoint, handler):
+        self._endpoint = endpoint
+        self._handler = handler
+
+    def __getattr__(self, method):
+        call = f'{self._endpoint}.{method}'
+        return lambda *args, **kwargs: self._handler(call, *args, **kwargs)
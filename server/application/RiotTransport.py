@@ -0,0 +1,134 @@
+"""
+Pooled keep-alive HTTP transport for the Riot API.
+
+Riot requests are routed to a platform host (e.g. na1.api.riotgames.com) or a regional
+host (e.g. americas.api.riotgames.com, see RiotWatcher.platform_to_regional). RiotTransport
+is a requests Session that gives every one of those hosts its own connection pool, so that
+connections are kept alive and reused between calls instead of being re-opened.
+
+Settings are read from the environment (or the .env file) when the transport is created:
+
+    RIOT_POOL_MAXSIZE        -- connections kept open per host (default 10)
+    RIOT_POOL_BLOCK          -- "1" to wait for a free connection instead of opening an extra one (default 0)
+    RIOT_CONNECT_TIMEOUT     -- seconds to wait for a connection (default 3.05)
+    RIOT_READ_TIMEOUT        -- seconds to wait for a response (default 10)
+
+Example usage:
+
+    transport = RiotTransport()
+    lol_watcher = LolWatcher(YOUR_RIOT_API_KEY)
+    attach_transport(lol_watcher, transport)
+
+    print(transport.stats()) # {'americas.api.riotgames.com': {'requests': 12, 'connections': 2, 'reused': 10}}
+"""
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+import threading
+import os
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class PooledHostAdapter(HTTPAdapter):
+    """
+    HTTPAdapter bound to a single Riot host. Applies the default timeout when the caller
+    does not give one and keeps request/connection counters for reuse metrics.
+    """
+
+    def __init__(self, host, timeout, pool_maxsize, pool_block):
+        self.host = host
+        self.timeout = timeout
+        self.requests_sent = 0
+        self._counter_lock = threading.Lock()
+        super().__init__(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=pool_block)
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+        with self._counter_lock:
+            self.requests_sent += 1
+        return super().send(request, timeout=timeout, **kwargs)
+
+    def connections_opened(self):
+        """Number of TCP connections opened so far for this host."""
+        return sum(pool.num_connections for pool in self._pools())
+
+    def _pools(self):
+        pools = self.poolmanager.pools
+        return [pools[key] for key in pools.keys()]
+
+
+class RiotTransport(Session):
+    """
+    Session with one keep-alive connection pool per Riot host.
+
+    Adapters are created the first time a host is requested, so every platform and regional
+    routing value gets its own pool without listing them up front.
+    """
+
+    def __init__(self, pool_maxsize=None, pool_block=None, connect_timeout=None, read_timeout=None):
+        super().__init__()
+        self.pool_maxsize = pool_maxsize or _env_int('RIOT_POOL_MAXSIZE', 10)
+        self.pool_block = pool_block if pool_block is not None else bool(_env_int('RIOT_POOL_BLOCK', 0))
+        self.timeout = (
+            connect_timeout or _env_float('RIOT_CONNECT_TIMEOUT', 3.05),
+            read_timeout or _env_float('RIOT_READ_TIMEOUT', 10.0)
+        )
+        self._host_adapters = {}
+        self._adapters_lock = threading.Lock()
+
+    def get_adapter(self, url):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            return super().get_adapter(url)
+
+        host = parts.netloc.lower()
+        adapter = self._host_adapters.get(host)
+        if adapter is None:
+            with self._adapters_lock:
+                adapter = self._host_adapters.get(host)
+                if adapter is None:
+                    adapter = PooledHostAdapter(host, self.timeout, self.pool_maxsize, self.pool_block)
+                    self._host_adapters[host] = adapter
+        return adapter
+
+    def stats(self):
+        """
+        Connection reuse metrics per host.
+
+        Returns:
+            dict: {host: {'requests': int, 'connections': int, 'reused': int}}
+        """
+        stats = {}
+        for host, adapter in list(self._host_adapters.items()):
+            connections = adapter.connections_opened()
+            stats[host] = {
+                'requests': adapter.requests_sent,
+                'connections': connections,
+                'reused': max(adapter.requests_sent - connections, 0)
+            }
+        return stats
+
+    def close(self):
+        for adapter in list(self._host_adapters.values()):
+            adapter.close()
+        super().close()
+
+
+def attach_transport(watcher, transport):
+    """
+    Routes every request made by a riotwatcher LolWatcher through the given transport.
+    riotwatcher issues all of its calls through the session held by its BaseApi.
+    """
+    watcher._base_api._session = transport
+    return watcher
@@ -7,6 +7,8 @@ get_puuid(user: str, region: str)
 
     returns:    string 
 
+    raises:     SummonerNotFoundError -- No summoner of that name in the region
+
 get_matchlist(user: str, region: str, num_matches: int)
     Get the match IDs for a specified number of games
 
@@ -17,6 +19,19 @@ get_matchlist(user: str, region: str, num_matches: int)
 
     returns:    list
 
+get_matchlist_page(puuid: str, region: str, start: int, count: int, start_time: int, end_time: int)
+    Get one page of match IDs, most recent first, for paging through a player's history
+
+    parameters: puuid (string) -- The puuid of the player
+                region (string) -- The full name of the region (e.g., "North America")
+                start (int) -- Index of the first match ID to return (0 is the most recent match)
+
+    parameters (optional): count -- number of match IDs in the page (default and maximum is 100)
+                           start_time -- only matches played after this epoch timestamp, in seconds
+                           end_time -- only matches played before this epoch timestamp, in seconds
+
+    returns:    list
+
 get_player_match_stats(puuid: str, matches: list, region: str, [stats]: list):
     Get the stats for a list of matches for any given player
 
@@ -36,6 +51,19 @@ platform_to_regional(region: str)
 
     returns: string
 
+region_groups()
+    The full names of the regions, grouped by their regional routing value (e.g., {"AMERICAS": ["North America", ...], ...})
+
+    returns: dictionary
+
+get_transport_stats()
+    Connection reuse metrics for every Riot host that has been called (see RiotTransport)
+
+    returns: dictionary
+
+
+The Riot calls can be recorded to, or replayed from, a corpus directory (RIOT_RECORD_DIR,
+RIOT_REPLAY_DIR and RIOT_REPLAY_LATENCY, see RiotReplay).
 
 Example usage:
 
@@ -54,44 +82,97 @@ Example usage:
 from riotwatcher import LolWatcher, ApiError
 from datetime import datetime
 from dotenv import load_dotenv
+from .RiotTransport import RiotTransport, attach_transport
+from .SingleFlight import SingleFlight
+from .CircuitBreaker import CircuitBreaker, CircuitOpenError, UpstreamUnavailableError, call_with_retries
+from .RiotReplay import RecordingWatcher, ReplayWatcher
+import threading
 import pprint
 import os
 
 load_dotenv()
-YOUR_RIOT_API_KEY = os.environ['YOUR_RIOT_API_KEY']
-lol_watcher = LolWatcher(YOUR_RIOT_API_KEY)
+transport = RiotTransport()
+
+if os.environ.get('RIOT_REPLAY_DIR'):
+    # Serve the calls from a recorded corpus, without network access (see RiotReplay)
+    lol_watcher = ReplayWatcher(os.environ['RIOT_REPLAY_DIR'], float(os.environ.get('RIOT_REPLAY_LATENCY', 0)))
+else:
+    YOUR_RIOT_API_KEY = os.environ['YOUR_RIOT_API_KEY']
+    lol_watcher = attach_transport(LolWatcher(YOUR_RIOT_API_KEY), transport)
+
+    if os.environ.get('RIOT_RECORD_DIR'):
+        lol_watcher = RecordingWatcher(lol_watcher, os.environ['RIOT_RECORD_DIR'])
+
+# Concurrent lookups of the same (endpoint, region, id) share one Riot call
+flight = SingleFlight()
+
+# One circuit breaker per routing value (platform or regional host)
+breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(routing):
+    """The circuit breaker of a routing value, shared by every Riot client of the process."""
+    with _breakers_lock:
+        breaker = breakers.get(routing)
+        if breaker is None:
+            breaker = breakers[routing] = CircuitBreaker(routing)
+        return breaker
+
+
+def _riot_call(routing, key, func, *args, **kwargs):
+    """Calls Riot through the host's circuit breaker with retries. Concurrent duplicate calls are coalesced."""
+    return flight.do(key, call_with_retries, get_breaker(routing), func, *args, **kwargs)
+
 
 pp = pprint.PrettyPrinter(indent=4)
 
+# Platform routing value of every region
+regions = {
+    'North America': 'NA1',
+    'Europe West': 'EUW1',
+    'Europe Nordic & East': 'EUN1',
+    'Brazil': 'BR1',
+    'Korea': 'KR',
+    'Japan': 'JP1',
+    'Latin America North': 'LA1',
+    'Latin America South': 'LA2',
+    'Oceania': 'OC1',
+    'Russia': 'RU',
+    'Turkey': 'TR1'
+}
+
+class SummonerNotFoundError(LookupError):
+    """
+    Raised when Riot has no summoner of the given name in the region.
+    """
+    def __init__(self, message):
+        super().__init__(message)
+
+
 def get_puuid(user, region):
-    regions = {
-        'North America': 'NA1',
-        'Europe West': 'EUW1',
-        'Europe Nordic & East': 'EUN1',
-        'Brazil': 'BR1',
-        'Korea': 'KR',
-        'Japan': 'JP1',
-        'Latin America North': 'LA1',
-        'Latin America South': 'LA2',
-        'Oceania': 'OC1',
-        'Russia': 'RU',
-        'Turkey': 'TR1'
-    }
+    platform = regions[region]
     try:
-        player = lol_watcher.summoner.by_name(regions[region], user)
+        player = _riot_call(platform, ('summoner.by_name', platform, user), lol_watcher.summoner.by_name, platform, user)
     except ApiError as err:
-        if err.response.status_code == 429:
-            print('Too many requests. Try again later.')
-        elif err.response.status_code == 404:
-            print('Summoner not found. Check username and region.')
-        else:
-            raise
+        # 429s are retried, then raised as UpstreamUnavailableError, by call_with_retries
+        if err.response is not None and err.response.status_code == 404:
+            raise SummonerNotFoundError(f'Summoner {user} not found in {region}.') from err
+        raise
     return player['puuid']
 
 
 def get_matchlist(puuid, region, num_matches=1):    
     region = platform_to_regional(region)
-    return lol_watcher.match.matchlist_by_puuid(region, puuid, count=num_matches)
+    return _riot_call(region, ('match.matchlist_by_puuid', region, (puuid, num_matches)),
+                      lol_watcher.match.matchlist_by_puuid, region, puuid, count=num_matches)
+
+
+def get_matchlist_page(puuid, region, start, count=100, start_time=None, end_time=None):
+    region = platform_to_regional(region)
+    return _riot_call(region, ('match.matchlist_by_puuid', region, (puuid, start, count, start_time, end_time)),
+                      lol_watcher.match.matchlist_by_puuid, region, puuid,
+                      start=start, count=count, start_time=start_time, end_time=end_time)
 
 
 def get_player_match_stats(puuid, region, matches, *args):
@@ -100,7 +181,7 @@ def get_player_match_stats(puuid, region, matches, *args):
 
     for match in matches:
         player_match_stats = {}
-        match_dto = lol_watcher.match.by_id(region, match)
+        match_dto = _riot_call(region, ('match.by_id', region, match), lol_watcher.match.by_id, region, match)
 
         # convert unix timestamp to datetime
         # ts = match_dto['info']['gameEndTimestamp']/1000
@@ -119,10 +200,25 @@ def platform_to_regional(region):
     americas = ['North America', 'Latin America North', 'Latin America South',
                 'Brazil']
     asia = ['Japan', 'Korea']
+    # Oceania's match-v5 data is served by the SEA host, not by EUROPE
+    sea = ['Oceania']
 
     if region in americas: 
         return 'AMERICAS'
     elif region in asia:
         return 'ASIA'
+    elif region in sea:
+        return 'SEA'
     else:
         return 'EUROPE'
+
+
+def region_groups():
+    groups = {}
+    for region in regions:
+        groups.setdefault(platform_to_regional(region), []).append(region)
+    return groups
+
+
+def get_transport_stats():
+    return transport.stats()
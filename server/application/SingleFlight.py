@@ -0,0 +1,79 @@
+"""
+Single-flight request coalescing.
+
+When several threads ask for the same resource at the same time, only the first one (the leader)
+performs the call. The others wait for it and receive the same result, or the same exception.
+Once the call has finished the key is forgotten, so a later request triggers a fresh call.
+
+Example usage:
+
+    flight = SingleFlight()
+    match_dto = flight.do(('match.by_id', 'AMERICAS', 'NA1_4255177813'), lol_watcher.match.by_id, 'AMERICAS', 'NA1_4255177813')
+"""
+
+import threading
+
+
+class _Call:
+    """An in-flight call that followers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key, e.g. (endpoint, region, id).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs) unless a call with the same key is already in flight,
+        in which case waits for that call and shares its outcome.
+
+        Args:
+            key (hashable): Identifies the resource being requested
+            func (callable): Performs the request
+
+        Raises:
+            Exception: Whatever func raised, re-raised in every caller that shared the call
+
+        Returns:
+            The value returned by func
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
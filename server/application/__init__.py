@@ -1,8 +1,30 @@
 from flask import Flask
 from .FirebaseFuncs import FirebaseFuncs
+from .Profiling import ProfilingMiddleware
+from os import environ
+import atexit
 
 app = Flask(__name__)
 app.config['FLASK_ENV'] = "development"
+# Profiles requests sent with the X-Profile admin header or picked by sampling, see Profiling.py
+app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
 fbase = FirebaseFuncs.FirebaseFuncs()
 
+if environ.get('LEAGUESTATS_WRITE_BEHIND'):
+    # Buffer leaguestats inserts and point increments, flushed in large batches
+    fbase.enable_write_behind(
+        max_items=int(environ.get('LEAGUESTATS_FLUSH_SIZE', 400)),
+        max_delay=float(environ.get('LEAGUESTATS_FLUSH_SECONDS', 2.0)),
+        journal_path=environ.get('LEAGUESTATS_JOURNAL')
+    )
+    atexit.register(fbase.disable_write_behind)
+
+if environ.get('LIVE_LEADERBOARD'):
+    # Serve leaderboards from memory, fed by FireStore snapshot listeners
+    fbase.enable_live_leaderboard("League of Legends")
+
+# Partition leaderboards by the regions of the Riot API
+from application import RiotWatcher
+fbase.set_leaderboard_regions(RiotWatcher.region_groups())
+
 from application import routes
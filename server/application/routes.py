@@ -1,6 +1,7 @@
 from ast import Index
 from flask import request, abort
 from application import app, fbase, RiotWatcher
+from .ResponseCache import cached_response
 from .FirebaseFuncs.FirebaseFuncs import CurrentUserNotSet, UserAuthenticationError, UserTokenError
 from firebase_admin import auth, exceptions
 import json
@@ -61,17 +62,19 @@ def register():
 
             if password != confirmpassword:
                 return abort(400)
-            fbase.add_new_user_email_and_password(email, password)
-            authenticate = fbase.authenticate_user(email, password)
 
+            gamer_handles = {}
             for game in gamerhandles:
                 game_name, gamerhandle = game.popitem()
-                fbase.set_user_player_id(gamerhandle, game_name)
+                gamer_handles[game_name] = gamerhandle
 
-            fbase.set_user_charity(charity)
+            # Validates the games and charity, then writes the user, handles and charity in one batch
+            authenticate = fbase.register_user(email, password, gamer_handles, charity)
 
         except auth.EmailAlreadyExistsError: 
             return abort(400)
+        except exceptions.AlreadyExistsError:
+            return abort(400)
         except UserAuthenticationError:
             return abort(404)
         except KeyError:
@@ -80,6 +83,8 @@ def register():
             return abort(400)
         except IndexError:
             return abort(400)
+        except ValueError:
+            return abort(400)
         else:
             return  json.dumps({'success': True}), 200, {'ContentType':'application/json'}
 
@@ -87,6 +92,7 @@ def register():
 
 
 @app.route("/api/get_all_charities")
+@cached_response(ttl=60)
 def get_all_charities():
     """
     Provides all the charity's data.
@@ -98,6 +104,37 @@ def get_all_charities():
     return abort(405)
 
 
+@app.route("/api/search_charities")
+def search_charities():
+    """
+    Searches the charities by name and description, with optional filters.
+    URL Example: http://localhost:8080/api/search_charities?q=animal&category=Animals&page=1&page_size=20
+
+    Args:
+        q: Words, or beginnings of words, to look for. Optional.
+        category, location, year: Filters. Optional.
+        page, page_size: Pagination. Defaults to the first 20 results.
+
+    Returns a JSON, as an example:
+        {"charities": [{"name": "Animal Shelter", ...}], "total": 1, "page": 1, "page_size": 20}
+    """
+    if request.method == "GET":
+        try:
+            page = int(request.args.get('page', 1))
+            page_size = int(request.args.get('page_size', 20))
+        except ValueError:
+            return abort(400)
+
+        if page < 1 or not 1 <= page_size <= 100:
+            return abort(400)
+
+        results = fbase.search_charities(request.args.get('q', ''), request.args.get('category'),
+                                         request.args.get('location'), request.args.get('year'), page, page_size)
+        return json.dumps(results), 200, {'ContentType':'application/json'}
+
+    return abort(405)
+
+
 @app.route("/api/set_charity", methods=["POST"])
 def set_charity():
     """
@@ -147,10 +184,20 @@ def get_user_league_games():
         try:
             fbase.authenticate_user("mob@example.com", "password")
             summoner_name, region = fbase.get_user_handle_and_region()
-            #region = "North America"
-            puid = RiotWatcher.get_puuid(summoner_name, region)
-            last_five_matches = RiotWatcher.get_matchlist(puid, "North America", 5)
-            stats = RiotWatcher.get_player_match_stats(puid, "North America", last_five_matches, "kills", "deaths", "assists", "win")
+            try:
+                puid = RiotWatcher.get_puuid(summoner_name, region)
+                last_five_matches = RiotWatcher.get_matchlist(puid, region, 5)
+                stats = RiotWatcher.get_player_match_stats(puid, region, last_five_matches, "kills", "deaths", "assists", "win")
+            except RiotWatcher.UpstreamUnavailableError:
+                # Riot is down or its circuit is open, serve the last stored games instead of waiting
+                stats = fbase.get_stored_league_matches(summoner_name, 5)
+                if not stats:
+                    return abort(503)
+                return json.dumps(stats), 200, {'ContentType':'application/json'}
+            except RiotWatcher.SummonerNotFoundError:
+                # The handle given on registration does not exist in the user's region
+                return abort(404)
+
             fbase.add_league_matches(summoner_name, stats)
             return json.dumps(stats), 200, {'ContentType':'application/json'}
 
@@ -163,6 +210,7 @@ def get_user_league_games():
 
 
 @app.route("/api/get_leaderboard")
+@cached_response(ttl=5, key_args=('game', 'num_of_choices', 'window', 'region'))
 def get_leaderboard():
     """
     Returns the top 3 players with the most charity points.
@@ -170,6 +218,8 @@ def get_leaderboard():
 
     Args:
         Requires a gamename.
+        Optional window, 'week' or 'month', for the points earned this week or month only.
+        Optional region, e.g. North_America, or regional routing value, e.g. AMERICAS, for its players only.
 
     Returns a JSON, as an example:
         [{"topo": 692}, {"topo": 0}, {"topo": 0}]
@@ -178,12 +228,43 @@ def get_leaderboard():
         game_name = request.args['game']
         game_name = game_name.replace('_', ' ')
         num_choices = request.args['num_of_choices']
-        leaderboard = fbase.get_leaderboard(num_choices, game_name)
+        try:
+            region = request.args.get('region')
+            if region is not None:
+                region = region.replace('_', ' ')
+            leaderboard = fbase.get_leaderboard(num_choices, game_name, request.args.get('window'), region)
+        except ValueError:
+            return abort(400)
         return json.dumps(leaderboard), 200, {'ContentType':'application/json'}
 
     return abort(405)
 
 
+@app.route("/api/get_leaderboard_rank")
+def get_leaderboard_rank():
+    """
+    Returns the logged in user's position on a game's leaderboard.
+    URL Example: http://localhost:8080/api/get_leaderboard_rank?game=League_of_Legends
+
+    Returns a JSON, as an example:
+        {"rank": 4}
+    """
+    if request.method == "GET":
+        try:
+            game_name = request.args['game'].replace('_', ' ')
+            rank = fbase.get_user_leaderboard_rank(game_name)
+            return json.dumps({'rank': rank}), 200, {'ContentType':'application/json'}
+
+        except KeyError:
+            return abort(400)
+        except exceptions.NotFoundError:
+            return abort(404)
+        except (CurrentUserNotSet, UserTokenError):
+            return abort(401)
+
+    return abort(405)
+
+
 @app.route("/api/get_user_data")
 def get_user_data():
     """
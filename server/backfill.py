@@ -0,0 +1,25 @@
+"""
+Backfills a player's League of Legends match history into the database.
+See application/Backfill.py.
+
+    python backfill.py <summoner name> <region> [--depth 1000] [--since YYYY-MM-DD] [--workers 4] [--restart]
+"""
+from application import fbase
+from application.Backfill import backfill_player
+from datetime import datetime, timezone
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill a player's League of Legends match history.")
+    parser.add_argument('player_id', help='Summoner name of the player')
+    parser.add_argument('region', help='Full name of the region, e.g. "North America"')
+    parser.add_argument('--depth', type=int, default=1000, help='How many of the most recent matches to go through')
+    parser.add_argument('--since', help='Only matches played after this date (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=4, help='Match details fetched at the same time')
+    parser.add_argument('--restart', action='store_true', help='Ignore saved progress')
+    args = parser.parse_args()
+
+    since = datetime.strptime(args.since, '%Y-%m-%d').replace(tzinfo=timezone.utc) if args.since else None
+    added = backfill_player(fbase, args.player_id, args.region, max_matches=args.depth, since=since,
+                            workers=args.workers, restart=args.restart)
+    print(f'Added {added} matches for {args.player_id}.')
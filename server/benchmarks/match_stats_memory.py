@@ -0,0 +1,63 @@
+"""
+Compares the memory used by 100k matches in the dict form returned by get_player_match_stats
+with the compact MatchStats / MatchHistory forms.
+
+Usage (from the server directory):
+
+    python benchmarks/match_stats_memory.py [num_matches]
+"""
+
+import os
+import random
+import sys
+import tracemalloc
+
+# Import MatchStats on its own so the Firebase and Riot connections are not set up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'application'))
+from MatchStats import MatchStats, MatchHistory
+
+
+def build_dict_form(num_matches):
+    return {
+        f'NA1_{4255177813 + i}': {
+            'kills': random.randint(0, 20),
+            'deaths': random.randint(0, 20),
+            'assists': random.randint(0, 30),
+            'win': random.random() < 0.5
+        }
+        for i in range(num_matches)
+    }
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    num_matches = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    stats = build_dict_form(num_matches)
+    match_ids = [sys.intern(match_id) for match_id in stats]
+
+    # Match ID strings are shared by every form, so they are built before measuring
+    _, dict_size = measure(lambda: {
+        match_id: dict(stats[match_id]) for match_id in match_ids
+    })
+    _, slots_size = measure(lambda: [
+        MatchStats(match_id, **stats[match_id]) for match_id in match_ids
+    ])
+    history, history_size = measure(lambda: MatchHistory.from_stats(stats))
+
+    assert history.to_dict() == stats
+
+    print(f'{num_matches} matches')
+    for name, size in (('dict of dicts', dict_size), ('MatchStats list', slots_size), ('MatchHistory', history_size)):
+        print(f'{name:<16} {size / 1024 / 1024:8.2f} MiB  {size / num_matches:6.1f} bytes/match  '
+              f'{dict_size / size:5.1f}x vs dicts')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Replays a recorded Riot API corpus through the match extraction and ingestion code paths, without
+network access, and reports their throughput. See application/RiotReplay.py.
+
+Record a corpus first, with a real API key (from the server directory):
+
+    python benchmarks/riot_replay.py record corpus "Topo:North America" "Caps:Europe West" --matches 50
+
+Then replay it:
+
+    python benchmarks/riot_replay.py replay corpus [--latency-scale 1.0] [--repeat 3] [--profile replay.prof]
+
+Replay goes through the same RiotWatcher functions as get_user_league_games (circuit breakers, retries
+and single-flight included). With the Firebase emulators, the matches are then ingested like
+get_user_league_games does: every recorded player is registered, signed in, and their matches are added
+with FirebaseFuncs.add_league_matches, so deduplication, the batch, the charity points, the profile and
+the leaderboard windows are all measured. Sign-ins are not timed. This wipes the emulator database:
+
+    firebase emulators:start --only firestore,auth
+    FIRESTORE_EMULATOR_HOST=localhost:8081 FIREBASE_AUTH_EMULATOR_HOST=localhost:9099 python benchmarks/riot_replay.py replay corpus [--write-behind]
+
+With --write-behind, the matches are buffered by the write-behind buffer instead, and written by one timed flush.
+"""
+
+import argparse
+import cProfile
+import os
+import sys
+import time
+import types
+
+import requests
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STATS = ('kills', 'deaths', 'assists', 'win')
+CHARITY = 'Benchmark Charity'
+PASSWORD = 'password'
+
+
+def import_application(corpus_dir, mode, latency_scale=0.0):
+    """
+    Imports RiotWatcher set up to record to, or replay from, the corpus. The application package is
+    registered without running its __init__, so the Firebase connection and routes are not set up.
+    """
+    os.environ.pop('RIOT_RECORD_DIR', None)
+    os.environ.pop('RIOT_REPLAY_DIR', None)
+    os.environ['RIOT_RECORD_DIR' if mode == 'record' else 'RIOT_REPLAY_DIR'] = corpus_dir
+    os.environ['RIOT_REPLAY_LATENCY'] = str(latency_scale)
+
+    application = types.ModuleType('application')
+    application.__path__ = [os.path.join(SERVER_DIR, 'application')]
+    sys.modules['application'] = application
+
+    from application import RiotWatcher
+    return RiotWatcher
+
+
+def record(args):
+    RiotWatcher = import_application(args.corpus, 'record')
+
+    for player in args.players:
+        summoner_name, region = player.split(':', 1)
+        puuid = RiotWatcher.get_puuid(summoner_name, region)
+        matches = RiotWatcher.get_matchlist(puuid, region, args.matches)
+        RiotWatcher.get_player_match_stats(puuid, region, matches, *STATS)
+        print(f'Recorded {len(matches)} matches of {summoner_name} ({region}).')
+
+
+def recorded_matchlists(RiotWatcher):
+    """(puuid, region, count) of every recorded matchlist call, with a region of its regional routing value."""
+    region_of_routing = {routing: regions[0] for routing, regions in RiotWatcher.region_groups().items()}
+
+    for recorded in RiotWatcher.lol_watcher.corpus:
+        if recorded['call'] == 'match.matchlist_by_puuid' and recorded['status'] is None:
+            routing, puuid = recorded['args']
+            yield puuid, region_of_routing[routing], recorded['kwargs']['count']
+
+
+def extract(RiotWatcher, matchlists):
+    """Fetches the stats of every recorded matchlist, like get_user_league_games. Returns {puuid: stats}."""
+    all_stats = {}
+    for puuid, region, count in matchlists:
+        matches = RiotWatcher.get_matchlist(puuid, region, count)
+        all_stats[puuid] = RiotWatcher.get_player_match_stats(puuid, region, matches, *STATS)
+    return all_stats
+
+
+def import_firebase():
+    """Connects to the Firebase emulators, like the application does, without the routes."""
+    from application.FirebaseFuncs.FirebaseFuncs import FirebaseFuncs
+    return FirebaseFuncs()
+
+
+def seed_emulator(fbase, puuids):
+    """
+    Wipes the emulators and registers one user per recorded player, whose League handle is the puuid.
+    Returns {puuid: email}.
+    """
+    project = fbase._db.project
+    requests.delete(f"http://{os.environ['FIRESTORE_EMULATOR_HOST']}/emulator/v1/projects/{project}/databases/(default)/documents")
+    requests.delete(f"http://{os.environ['FIREBASE_AUTH_EMULATOR_HOST']}/emulator/v1/projects/{project}/accounts")
+
+    fbase._db.collection('games').document('league').set({'name': 'League of Legends'})
+    fbase._db.collection('charity').document('benchmark').set({'name': CHARITY, 'charity_id': 1})
+
+    emails = {}
+    for i, puuid in enumerate(puuids):
+        emails[puuid] = f'player{i}@example.com'
+        fbase.register_user(emails[puuid], PASSWORD, {'League of Legends': puuid}, CHARITY)
+    return emails
+
+
+def ingest(fbase, emails, all_stats, write_behind=False):
+    """
+    Adds the matches of every player with add_league_matches, signed in as that player.
+    Returns the seconds spent in add_league_matches. With write_behind, the buffer holds every match
+    until the final flush, which is timed, so that no flush runs unmeasured during a sign-in.
+    """
+    if write_behind:
+        num_matches = sum(len(stats) for stats in all_stats.values())
+        fbase.enable_write_behind(max_items=num_matches + 1, max_delay=3600.0)
+
+    elapsed = 0.0
+    for puuid, stats in all_stats.items():
+        fbase.authenticate_user(emails[puuid], PASSWORD)
+        elapsed += timed(fbase.add_league_matches, puuid, stats)[1]
+
+    if write_behind:
+        elapsed += timed(fbase.disable_write_behind)[1]
+    return elapsed
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def report(name, elapsed, num_matches):
+    print(f'{name:<12} {elapsed:8.3f} s  {num_matches / elapsed:10.1f} matches/s')
+
+
+def replay(args):
+    RiotWatcher = import_application(args.corpus, 'replay', args.latency_scale)
+    matchlists = list(recorded_matchlists(RiotWatcher))
+    if not matchlists:
+        sys.exit(f'No matchlist recorded in {args.corpus}.')
+
+    fbase = None
+    if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+        if not os.environ.get('FIREBASE_AUTH_EMULATOR_HOST'):
+            sys.exit('FIREBASE_AUTH_EMULATOR_HOST must be set too, players are signed in to ingest their matches.')
+        fbase = import_firebase()
+    else:
+        print('FIRESTORE_EMULATOR_HOST is not set, only extraction is measured.')
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+
+    for run in range(args.repeat):
+        all_stats, extraction = timed(extract, RiotWatcher, matchlists)
+        num_matches = sum(len(stats) for stats in all_stats.values())
+        print(f'Run {run + 1}: {len(matchlists)} players, {num_matches} matches, latency scale {args.latency_scale}')
+
+        report('extraction', extraction, num_matches)
+        if fbase is not None:
+            # Every run starts from an empty database, so that no match is skipped as already stored
+            emails = seed_emulator(fbase, list(all_stats))
+            report('ingestion', ingest(fbase, emails, all_stats, args.write_behind), num_matches)
+
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f'Profile written to {args.profile}, view it with "python -m pstats {args.profile}".')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record or replay Riot API calls to benchmark match extraction and ingestion.')
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Record the matches of players with the real Riot API')
+    record_parser.add_argument('corpus', help='Corpus directory')
+    record_parser.add_argument('players', nargs='+', help='"<summoner name>:<region>", e.g. "Topo:North America"')
+    record_parser.add_argument('--matches', type=int, default=20, help='Most recent matches recorded per player')
+
+    replay_parser = subparsers.add_parser('replay', help='Replay a corpus and report throughput')
+    replay_parser.add_argument('corpus', help='Corpus directory')
+    replay_parser.add_argument('--latency-scale', type=float, default=0.0, help='1 replays with the recorded latency, 0 without latency')
+    replay_parser.add_argument('--repeat', type=int, default=1, help='Number of runs')
+    replay_parser.add_argument('--profile', help='Write a cProfile of the runs to this file')
+    replay_parser.add_argument('--write-behind', action='store_true', help='Ingest through the write-behind buffer')
+
+    args = parser.parse_args()
+    if args.mode == 'record':
+        record(args)
+    else:
+        replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Checks that every route stays within its FireStore round-trip budget.
+
+Each route is called once through the Flask test client while QueryCounter counts the FireStore reads
+and writes it makes (see application/FirebaseFuncs/QueryCounter.py). The database is seeded with many
+users, so a route that queries once per user or per match (an N+1 pattern) goes over its budget.
+The script exits with status 1 if any route is over budget.
+
+Runs against the Firebase emulators only, since it wipes and seeds the database:
+
+    firebase emulators:start --only firestore,auth
+    FIRESTORE_EMULATOR_HOST=localhost:8081 FIREBASE_AUTH_EMULATOR_HOST=localhost:9099 python check_query_budgets.py
+
+The Riot API is not called: RiotWatcher returns canned matches, only the FireStore side is measured.
+"""
+import os
+import sys
+
+if not os.environ.get('FIRESTORE_EMULATOR_HOST') or not os.environ.get('FIREBASE_AUTH_EMULATOR_HOST'):
+    sys.exit('FIRESTORE_EMULATOR_HOST and FIREBASE_AUTH_EMULATOR_HOST must be set: this script wipes the database.')
+
+os.environ.setdefault('YOUR_RIOT_API_KEY', 'emulator')
+
+from application import app, fbase, RiotWatcher
+from application.ResponseCache import response_cache
+from application.FirebaseFuncs.QueryCounter import QueryCounter
+from application.FirebaseFuncs.Profiles import profile_reference
+from application.FirebaseFuncs.Timestamps import utc_now
+from application.FirebaseFuncs.LeaderboardWindows import add_window_points
+from firebase_admin import auth
+import requests
+
+# Users seeded besides the logged in user. Large enough for an N+1 pattern to show.
+NUM_SEEDED_USERS = 25
+EMAIL = "mob@example.com"
+PASSWORD = "password"
+
+# (method, url, json body, max reads, max writes)
+ROUTE_BUDGETS = [
+    ('GET', '/api/get_all_charities', None, 1, 0),
+    ('GET', '/api/search_charities?q=char&page_size=2', None, 1, 0),
+    ('POST', '/api/login', {'email': EMAIL, 'password': PASSWORD}, 1, 0),
+    ('POST', '/api/set_charity', {'charity_name': 'Charity 1'}, 1, 1),
+    ('GET', '/api/get_user_data', None, 1, 0),
+    ('GET', '/api/get_user_league_games', None, 6, 2),
+    ('GET', '/api/get_leaderboard?game=League_of_Legends&num_of_choices=complete', None, 3, 0),
+    ('GET', '/api/get_leaderboard?game=League_of_Legends&num_of_choices=complete&window=week', None, 3, 0),
+    # A page of the window and its player handles, instead of the whole window
+    ('GET', '/api/get_leaderboard?game=League_of_Legends&num_of_choices=mini&window=week', None, 3, 0),
+    ('GET', '/api/get_leaderboard?game=League_of_Legends&num_of_choices=mini&region=North_America', None, 3, 0),
+    # One page of top users per region and the player handles of the merged top users, instead of reading every user
+    ('GET', '/api/get_leaderboard?game=League_of_Legends&num_of_choices=mini', None, 13, 0),
+    ('GET', '/api/get_leaderboard_rank?game=League_of_Legends', None, 5, 0),
+    ('POST', '/api/register', {
+        'email': 'new@example.com',
+        'password': PASSWORD,
+        'confirmpassword': PASSWORD,
+        'gamerhandles': [{'League of Legends': 'newplayer'}],
+        'charity': 'Charity 2'
+    }, 3, 1),
+    ('GET', '/api/logout', None, 0, 0),
+]
+
+CANNED_MATCHES = {
+    f'NA1_{4255177813 + i}': {'kills': i, 'deaths': 2, 'assists': 3, 'win': i % 2 == 0}
+    for i in range(5)
+}
+
+
+def reset_emulators():
+    project = fbase._db.project
+    requests.delete(f"http://{os.environ['FIRESTORE_EMULATOR_HOST']}/emulator/v1/projects/{project}/databases/(default)/documents")
+    requests.delete(f"http://{os.environ['FIREBASE_AUTH_EMULATOR_HOST']}/emulator/v1/projects/{project}/accounts")
+
+
+def seed(db):
+    game = db.collection('games').document('league')
+    game.set({'name': 'League of Legends'})
+
+    for charity_id in range(1, 4):
+        db.collection('charity').document(f'Charity {charity_id}').set({'name': f'Charity {charity_id}', 'charity_id': charity_id})
+
+    logged_in_user = auth.create_user(email=EMAIL, password=PASSWORD)
+    user_ids = [logged_in_user.uid] + [f'seeded-user-{i}' for i in range(NUM_SEEDED_USERS)]
+
+    batch = db.batch()
+    for i, user_id in enumerate(user_ids):
+        user = db.collection('users').document(user_id)
+        user_data = {'user_region': 'North America', 'charity_points': 10 * i, 'created_at': utc_now(), 'charity': ''}
+        player_handle = 'topo' if i == 0 else f'player{i}'
+        batch.set(user, user_data)
+        batch.set(db.collection('userplayernames').document(), {'game': game, 'playerID': player_handle, 'user': user})
+        batch.set(profile_reference(db, user), dict(user_data, gamer_handles={'League of Legends': player_handle}))
+        add_window_points(batch, db, user, i)
+    batch.commit()
+
+
+def stub_riot():
+    RiotWatcher.get_puuid = lambda summoner_name, region: 'puuid'
+    RiotWatcher.get_matchlist = lambda puuid, region, num_matches=1: list(CANNED_MATCHES)[:num_matches]
+    RiotWatcher.get_player_match_stats = lambda puuid, region, matches, *args: {match: dict(CANNED_MATCHES[match]) for match in matches}
+
+
+def main():
+    reset_emulators()
+    seed(fbase._db)
+    stub_riot()
+
+    counter = QueryCounter(fbase._db)
+    client = app.test_client()
+    over_budget = []
+
+    print(f"{'route':<72} {'reads':>9} {'writes':>9}")
+    for method, url, body, max_reads, max_writes in ROUTE_BUDGETS:
+        response_cache.invalidate()
+
+        with counter.measure() as counts:
+            response = client.open(url, method=method, json=body)
+
+        ok = response.status_code == 200 and counts.reads <= max_reads and counts.writes <= max_writes
+        print(f"{method + ' ' + url:<72} {counts.reads:>4}/{max_reads:<4} {counts.writes:>4}/{max_writes:<4} "
+              f"{'ok' if ok else 'FAIL (HTTP %d)' % response.status_code}")
+        if not ok:
+            over_budget.append(url)
+
+    if over_budget:
+        print(f'{len(over_budget)} route(s) failed or went over their round-trip budget.')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
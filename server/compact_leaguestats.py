@@ -0,0 +1,17 @@
+"""
+Rolls old League of Legends matches into per-player monthly summaries.
+See application/FirebaseFuncs/Compaction.py. Safe to run again, e.g. daily from cron.
+
+    python compact_leaguestats.py [--older-than-days 90] [--page-size 200]
+"""
+from application import fbase
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compact old League of Legends matches into monthly summaries.')
+    parser.add_argument('--older-than-days', type=float, default=90, help='Age, in days, from which matches are compacted')
+    parser.add_argument('--page-size', type=int, default=200, help='Matches compacted per transaction')
+    args = parser.parse_args()
+
+    compacted = fbase.compact_league_stats(args.older_than_days, args.page_size)
+    print(f'Compacted {compacted} matches.')
@@ -0,0 +1,38 @@
+"""
+Exports collections to JSON Lines or Parquet files for analytics.
+See application/FirebaseFuncs/Export.py.
+
+    python export.py [--format jsonl|parquet] [--out exports] [--since "YYYY-MM-DD HH:MM:SS"] [collection ...]
+"""
+from application import fbase
+from application.FirebaseFuncs.Export import EXPORTABLE_COLLECTIONS, EXPORT_FIELDS, JsonLinesWriter, ParquetWriter
+from datetime import datetime
+import argparse
+import os
+
+WRITERS = {
+    'jsonl': lambda path, collection_name: JsonLinesWriter(path),
+    'parquet': lambda path, collection_name: ParquetWriter(path, EXPORT_FIELDS[collection_name])
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export collections for analytics.')
+    parser.add_argument('collections', nargs='*', default=list(EXPORTABLE_COLLECTIONS), help='Collections to export (default: all)')
+    parser.add_argument('--format', choices=WRITERS, default='jsonl')
+    parser.add_argument('--out', default='exports', help='Output directory')
+    parser.add_argument('--since', help='Only documents added after this UTC time, "YYYY-MM-DD[ HH:MM:SS]"')
+    parser.add_argument('--page-size', type=int, default=500, help='Documents held in memory at a time')
+    args = parser.parse_args()
+
+    since = datetime.fromisoformat(args.since) if args.since else None
+    os.makedirs(args.out, exist_ok=True)
+
+    for collection_name in args.collections:
+        if since is not None and EXPORTABLE_COLLECTIONS.get(collection_name, '') is None:
+            print(f'Skipping {collection_name}: it has no time field for an incremental export.')
+            continue
+
+        path = os.path.join(args.out, f'{collection_name}.{args.format}')
+        with WRITERS[args.format](path, collection_name) as writer:
+            exported = fbase.export_collection(collection_name, writer, args.page_size, since)
+        print(f'Exported {exported} documents from {collection_name} to {path}.')
@@ -0,0 +1,17 @@
+"""
+Converts the "%m/%d/%Y %H:%M:%S" string times of existing documents to native FireStore timestamps.
+See application/FirebaseFuncs/Timestamps.py. Safe to run again, converted documents are skipped.
+
+    python migrate_timestamps.py [--page-size 400]
+"""
+from application import fbase
+from application.FirebaseFuncs.Timestamps import migrate_timestamps
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert string times to FireStore timestamps.')
+    parser.add_argument('--page-size', type=int, default=400, help='Documents updated per batch, at most 500')
+    args = parser.parse_args()
+
+    for collection_name, migrated in migrate_timestamps(fbase._db, args.page_size).items():
+        print(f'Converted {migrated} documents in {collection_name}.')